@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+class TTLCache:
+    # Keys are tuples whose first item is the table they were read from, so a write to that
+    # table can drop every entry derived from it
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._generaciones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Hashable, ...], default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generacion(self, tabla: str) -> int:
+        with self._lock:
+            return self._generaciones.get(tabla, 0)
+
+    def set(self, key: Tuple[Hashable, ...], value: Any, generacion: int = None):
+        with self._lock:
+            # A load that started before an invalidation would store rows the write just replaced
+            if generacion is not None and generacion != self._generaciones.get(key[0], 0):
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, tabla: str):
+        with self._lock:
+            self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+            for key in [key for key in self._data if key[0] == tabla]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            for tabla in {key[0] for key in self._data} | set(self._generaciones):
+                self._generaciones[tabla] = self._generaciones.get(tabla, 0) + 1
+            self._data.clear()
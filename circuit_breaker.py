@@ -0,0 +1,56 @@
+import threading
+import time
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, max_reset_timeout: float = 300):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        # Open until the reset timeout expires; after that one trial call is let through
+        with self._lock:
+            return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.opened_at is not None:
+                print("[INFO] Database reachable again; circuit breaker closed.")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running:
+                # The trial failed: stay open and wait twice as long before the next one
+                self._trial_running = False
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self.opened_at = time.monotonic()
+            elif self.opened_at is None and self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                print(f"[ERROR] Database unreachable after {self.failures} failures; "
+                      f"pausing queries for {self.reset_timeout:.0f}s.")
+
+    def seconds_until_retry(self) -> float:
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Callable, List
+from mysql.connector.errors import PoolError
+
+class ConnectionPool:
+    def __init__(self, connect: Callable, size: int, timeout: float):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        # Used as a stack so the most recently used (and most likely still alive) connection is reused first
+        self._idle: List = []
+        self._created = 0
+        # Waiters wake when a connection comes back or a discarded one frees its slot
+        self._available = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolError(f"Timed out after {self.timeout}s waiting for a database connection "
+                                    f"(pool size {self.size})")
+                self._available.wait(remaining)
+
+        # Connecting happens outside the lock so other threads can keep returning connections
+        try:
+            return self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def release(self, connection):
+        with self._available:
+            self._idle.append(connection)
+            self._available.notify()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._free_slot()
+
+    def _free_slot(self):
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    def close_all(self):
+        with self._available:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self.discard(connection)
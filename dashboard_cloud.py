@@ -27,7 +27,8 @@ from PyQt6.QtCharts import (
 )
 
 from design_system import CLOUD_THEME, CLOUD_STYLE, APP_FONT
-from db_manager import DatabaseManager
+from inventory_repository import InventoryRepository
+from query_executor import QueryExecutor
 
 class EnterpriseCard(QFrame):
     def __init__(self, title="", parent=None):
@@ -172,7 +173,7 @@ class ChartCard(EnterpriseCard):
                 bar_set = QBarSet(category)
                 bar_set.append(values)
                 series.append(bar_set)
-                categories.extend(values)
+                categories.extend(str(i + 1) for i in range(len(categories), len(values)))
             
             axis_x = QBarCategoryAxis()
             axis_x.append(categories)
@@ -295,13 +296,22 @@ class ActivityItem(QFrame):
 class DashboardCloud(QWidget):
     refresh_requested = pyqtSignal()
     
-    def __init__(self, db_manager: DatabaseManager, parent=None):
+    def __init__(self, repository: InventoryRepository, parent=None):
         super().__init__(parent)
-        self.db_manager = db_manager
+        self.repository = repository
+        # Aggregates and loan history are not held by the repository, so they are still queried
+        self.db_manager = repository.db
+        self.executor = QueryExecutor(self)
         self.setupUI()
-        self.setupRefreshTimer()
+        repository.prestamos_abiertos.connect(self.onLoansChanged)
+        repository.prestamos_cerrados.connect(self.onLoansChanged)
         self.loadData()
 
+    def onLoansChanged(self, changed):
+        # Hidden, the dashboard waits for the refresh scheduler instead of querying for nothing
+        if self.isVisible():
+            self.loadData()
+
     def setupUI(self):
         self.setStyleSheet(CLOUD_STYLE)
         self.setFont(APP_FONT)
@@ -432,20 +442,23 @@ class DashboardCloud(QWidget):
         
         layout.addWidget(self.status_bar)
 
-    def setupRefreshTimer(self):
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.loadData)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
-
     def loadData(self):
+        self.showLoadingState(True)
+        self.executor.submit('dashboard', self.fetchData, self.applyData, self.onLoadError)
+
+    def fetchData(self):
+        # Runs on a worker thread: database access only, no widgets
+        stats = self.db_manager.obtener_estadisticas()
+        recent_loans = self.db_manager.obtener_prestamos_recientes(5)
+        overdue_loans = self.db_manager.obtener_prestamos_vencidos(7)
+        window_start = datetime.combine(datetime.now().date(), datetime.min.time()) - timedelta(days=6)
+        loans = self.db_manager.obtener_prestamos_df(desde=window_start)
+        active_by_day = self.countActiveLoansByDay(loans, 7)
+        return stats, recent_loans, overdue_loans, active_by_day
+
+    def applyData(self, data):
+        stats, recent_loans, overdue_loans, active_by_day = data
         try:
-            self.showLoadingState(True)
-            
-            # Fetch data from database
-            devices = self.db_manager.obtener_maquinas()
-            loans = self.db_manager.obtener_prestamos()
-            supervisors = self.db_manager.obtener_supervisores()
-            
             # Reset all metrics and charts to empty state
             self.total_devices.metric_value = 0
             self.active_devices.metric_value = 0
@@ -456,21 +469,21 @@ class DashboardCloud(QWidget):
             self.activity_list.clear()
             self.alerts_list.clear()
             
-            if not any([devices, loans, supervisors]):
+            if not stats['total'] and not recent_loans:
                 self.showMessage("No Data Available", "Please add devices, supervisors, and create loans to get started.", "info")
                 self.status_label.setText("No data available - System ready for data input")
                 self.showLoadingState(False)
                 return
             
-            if not devices:
+            if not stats['total']:
                 self.showMessage("No Devices Found", "Please add some devices to get started", "info")
             else:
-                self.updateMetrics(devices, loans)
-                self.updateCharts(devices, loans)
+                self.updateMetrics(stats)
+                self.updateCharts(stats, active_by_day)
             
-            if loans and supervisors:
-                self.updateActivityList(loans, supervisors)
-                self.updateAlerts(devices, loans)
+            if recent_loans:
+                self.updateActivityList(recent_loans)
+                self.updateAlerts(stats, overdue_loans)
             
             self.showLoadingState(False)
             self.status_label.setText(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -480,12 +493,15 @@ class DashboardCloud(QWidget):
             self.showLoadingState(False)
             self.status_label.setText("Error loading data - Check system logs")
 
-    def updateMetrics(self, devices, loans):
-        total = len(devices)
-        active = sum(1 for d in devices if d['estado'] == 'en_uso')
-        alerts_count = sum(1 for l in loans if 
-            l['fecha_devolucion'] is None and 
-            (datetime.now() - l['fecha_prestamo']).days > 7)
+    def onLoadError(self, message):
+        self.showMessage("Error", f"Failed to load dashboard data: {message}", "error")
+        self.showLoadingState(False)
+        self.status_label.setText("Error loading data - Check system logs")
+
+    def updateMetrics(self, stats):
+        total = stats['total']
+        active = stats['por_estado'].get('en_uso', 0)
+        alerts_count = stats['prestamos_vencidos']
         
         self.total_devices.metric_value = float(total)
         self.active_devices.metric_value = float(active)
@@ -495,23 +511,23 @@ class DashboardCloud(QWidget):
         health_score = 100 - (alerts_count * 5)
         self.system_health.metric_value = float(max(0, health_score))
 
-    def updateCharts(self, devices, loans):
+    def updateCharts(self, stats, active_by_day):
         # Update usage chart
-        usage_data = self.calculateUsageData(devices)
+        usage_data = self.calculateUsageData(stats, active_by_day)
         self.usage_chart.update_data(usage_data)
         
         # Update distribution chart
-        distribution_data = self.calculateDistributionData(devices)
+        distribution_data = self.calculateDistributionData(stats)
         self.distribution_chart.update_data(distribution_data)
         
         # Update performance chart
-        performance_data = self.calculatePerformanceData(devices, loans)
+        performance_data = self.calculatePerformanceData(stats)
         self.performance_chart.update_data(performance_data)
 
-    def updateActivityList(self, loans, supervisors):
+    def updateActivityList(self, loans):
         self.activity_list.clear()
         
-        recent_activities = self.getRecentActivities(loans, supervisors)
+        recent_activities = self.getRecentActivities(loans)
         for activity in recent_activities:
             self.activity_list.add_activity(
                 activity['title'],
@@ -521,10 +537,10 @@ class DashboardCloud(QWidget):
                 activity.get('icon')
             )
 
-    def updateAlerts(self, devices, loans):
+    def updateAlerts(self, stats, overdue_loans):
         self.alerts_list.clear()
         
-        alerts = self.generateAlerts(devices, loans)
+        alerts = self.generateAlerts(stats, overdue_loans)
         for alert in alerts:
             self.alerts_list.add_activity(
                 alert['title'],
@@ -556,49 +572,52 @@ class DashboardCloud(QWidget):
         
         msg.exec()
 
-    def calculateUsageData(self, devices):
+    def countActiveLoansByDay(self, loans, days):
+        # Loans open at the end of each of the last `days` days, oldest first: started before
+        # the cut-off minus returned before it. Two sorted searches instead of a pass per day.
+        tomorrow = np.datetime64(datetime.now().date() + timedelta(days=1), 'ns')
+        cutoffs = tomorrow - np.arange(days - 1, -1, -1).astype('timedelta64[D]')
+        if loans.empty:
+            return np.zeros(days, dtype=np.int64)
+        started = np.sort(loans['fecha_prestamo'].to_numpy(dtype='datetime64[ns]'))
+        returned = loans['fecha_devolucion'].to_numpy(dtype='datetime64[ns]')
+        returned = np.sort(returned[~np.isnat(returned)])
+        return np.searchsorted(started, cutoffs) - np.searchsorted(returned, cutoffs)
+
+    def calculateUsageData(self, stats, active_by_day):
         # Calculate usage trends over time
-        now = datetime.now()
-        usage_data = {}
+        usage_data = {'Activos': [], 'Disponibles': [], 'Mantenimiento': []}
+        maintenance_count = stats['por_estado'].get('mantenimiento', 0)
+        available_by_day = np.maximum(stats['total'] - maintenance_count - active_by_day, 0)
         
         # Calculate device usage over the last 7 days
-        for i in range(7):
-            date = now - timedelta(days=i)
-            active_count = len([d for d in devices if d['estado'] == 'en_uso'])
-            available_count = len([d for d in devices if d['estado'] == 'disponible'])
-            maintenance_count = len([d for d in devices if d['estado'] == 'mantenimiento'])
-            
-            usage_data[f'Activos'] = usage_data.get('Activos', []) + [(i, active_count)]
-            usage_data[f'Disponibles'] = usage_data.get('Disponibles', []) + [(i, available_count)]
-            usage_data[f'Mantenimiento'] = usage_data.get('Mantenimiento', []) + [(i, maintenance_count)]
+        for i in range(len(active_by_day)):
+            usage_data['Activos'].append((i, int(active_by_day[i])))
+            usage_data['Disponibles'].append((i, int(available_by_day[i])))
+            usage_data['Mantenimiento'].append((i, maintenance_count))
         
         return usage_data
 
-    def calculateDistributionData(self, devices):
-        # Calculate device distribution by category
-        categories = {}
-        for device in devices:
-            category = device.get('categoria', 'Other')
-            categories[category] = categories.get(category, 0) + 1
-        
-        return [(cat, count) for cat, count in categories.items()]
+    def calculateDistributionData(self, stats):
+        # Device distribution by category
+        return list(stats['por_categoria'].items())
 
-    def calculatePerformanceData(self, devices, loans):
-        # Calculate real performance metrics from database data
-        total_devices = len(devices)
+    def calculatePerformanceData(self, stats):
+        # Calculate real performance metrics from database aggregates
+        total_devices = stats['total']
         if total_devices == 0:
             return {}
 
         # Calculate device utilization
-        devices_in_use = len([d for d in devices if d['estado'] == 'en_uso'])
+        devices_in_use = stats['por_estado'].get('en_uso', 0)
         utilization_rate = (devices_in_use / total_devices) * 100
 
         # Calculate device availability
-        available_devices = len([d for d in devices if d['estado'] == 'disponible'])
+        available_devices = stats['por_estado'].get('disponible', 0)
         availability_rate = (available_devices / total_devices) * 100
 
         # Calculate maintenance rate
-        devices_in_maintenance = len([d for d in devices if d['estado'] == 'mantenimiento'])
+        devices_in_maintenance = stats['por_estado'].get('mantenimiento', 0)
         maintenance_rate = (devices_in_maintenance / total_devices) * 100
 
         performance_data = {
@@ -609,15 +628,13 @@ class DashboardCloud(QWidget):
         
         return performance_data
 
-    def getRecentActivities(self, loans, supervisors):
+    def getRecentActivities(self, loans):
         activities = []
         
-        for loan in loans[:5]:  # Get 5 most recent loans
-            supervisor = next((s for s in supervisors if s['id'] == loan['supervisor_id']), None)
-            
+        for loan in loans:
             activities.append({
                 'title': f"Device Loan",
-                'description': f"Device {loan['maquina_id']} loaned to {supervisor['nombre'] if supervisor else 'Unknown'}",
+                'description': f"Device {loan['maquina_id']} loaned to {loan['supervisor_nombre'] or 'Unknown'}",
                 'time': loan['fecha_prestamo'].strftime('%Y-%m-%d %H:%M'),
                 'status': 'info',
                 'icon': '📱'
@@ -625,29 +642,27 @@ class DashboardCloud(QWidget):
         
         return activities
 
-    def generateAlerts(self, devices, loans):
+    def generateAlerts(self, stats, overdue_loans):
         alerts = []
         
-        # Check for overdue loans
-        for loan in loans:
-            if loan['fecha_devolucion'] is None:
-                days_loaned = (datetime.now() - loan['fecha_prestamo']).days
-                if days_loaned > 7:
-                    alerts.append({
-                        'title': 'Overdue Device',
-                        'description': f"Device {loan['maquina_id']} has been loaned for {days_loaned} days",
-                        'time': datetime.now().strftime('%Y-%m-%d %H:%M'),
-                        'status': 'warning'
-                    })
+        # Overdue loans (already filtered by the database)
+        for loan in overdue_loans:
+            days_loaned = (datetime.now() - loan['fecha_prestamo']).days
+            alerts.append({
+                'title': 'Overdue Device',
+                'description': f"Device {loan['maquina_id']} has been loaned for {days_loaned} days",
+                'time': datetime.now().strftime('%Y-%m-%d %H:%M'),
+                'status': 'warning'
+            })
         
         # Check for inactive devices
-        inactive_devices = [d for d in devices if d['estado'] == 'inactive']
-        if inactive_devices:
+        inactive_count = stats['por_estado'].get('inactive', 0)
+        if inactive_count:
             alerts.append({
                 'title': 'Inactive Devices',
-                'description': f"Found {len(inactive_devices)} inactive devices",
+                'description': f"Found {inactive_count} inactive devices",
                 'time': datetime.now().strftime('%Y-%m-%d %H:%M'),
                 'status': 'warning'
             })
         
-        return alerts
\ No newline at end of file
+        return alerts
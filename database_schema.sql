@@ -1,5 +1,6 @@
 -- MySQL Schema for Cloud Inventory System
 -- Enterprise-grade structure with AWS/Azure/Google Cloud patterns
+-- The application applies this schema through migrations.py; keep both in sync.
 
 CREATE DATABASE IF NOT EXISTS cloud_inventory
     CHARACTER SET utf8mb4
@@ -22,7 +23,8 @@ CREATE TABLE IF NOT EXISTS maquinas (
     fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_estado (estado),
     INDEX idx_categoria (categoria),
-    INDEX idx_ubicacion (ubicacion)
+    INDEX idx_ubicacion (ubicacion),
+    INDEX idx_fecha_actualizacion (fecha_actualizacion)
 ) ENGINE=InnoDB;
 
 CREATE TABLE IF NOT EXISTS supervisores (
@@ -49,10 +51,21 @@ CREATE TABLE IF NOT EXISTS prestamos (
     FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
     FOREIGN KEY (supervisor_id) REFERENCES supervisores(id),
     INDEX idx_estado_prestamo (estado),
-    INDEX idx_fechas (fecha_prestamo, fecha_devolucion)
+    INDEX idx_fechas (fecha_prestamo, fecha_devolucion),
+    INDEX idx_prestamo_activo (maquina_id, fecha_devolucion),
+    INDEX idx_fecha_prestamo (fecha_prestamo),
+    INDEX idx_fecha_devolucion (fecha_devolucion)
 ) ENGINE=InnoDB;
 
 -- Maintenance System
+CREATE TABLE IF NOT EXISTS proveedores (
+    id VARCHAR(36) PRIMARY KEY,
+    nombre VARCHAR(255) NOT NULL,
+    contacto VARCHAR(255),
+    telefono VARCHAR(20),
+    email VARCHAR(255) UNIQUE
+) ENGINE=InnoDB;
+
 CREATE TABLE IF NOT EXISTS mantenimientos (
     id VARCHAR(36) PRIMARY KEY,
     maquina_id VARCHAR(36) NOT NULL,
@@ -69,6 +82,17 @@ CREATE TABLE IF NOT EXISTS mantenimientos (
     INDEX idx_estado_mant (estado)
 ) ENGINE=InnoDB;
 
+-- Alerts
+CREATE TABLE IF NOT EXISTS alertas (
+    id VARCHAR(36) PRIMARY KEY,
+    maquina_id VARCHAR(36) NOT NULL,
+    tipo VARCHAR(50) NOT NULL,
+    descripcion TEXT,
+    fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    resuelta BOOLEAN DEFAULT FALSE,
+    FOREIGN KEY (maquina_id) REFERENCES maquinas(id)
+) ENGINE=InnoDB;
+
 -- Audit System
 CREATE TABLE IF NOT EXISTS auditoria (
     id VARCHAR(36) PRIMARY KEY,
@@ -1,13 +1,109 @@
 import mysql.connector
+import base64
 import json
-from typing import Optional, Dict, List
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Optional, Dict, List, Iterator, Tuple
 from datetime import datetime
-from mysql.connector import Error
+from mysql.connector import Error, errorcode
+from mysql.connector.errors import OperationalError, InterfaceError, PoolError
+from connection_pool import ConnectionPool
+from migrations import MigrationRunner
+from query_stats import QueryStats, metodo_llamador
+from circuit_breaker import CircuitBreaker
+from cache import TTLCache
+
+@lru_cache(maxsize=64)
+def tipo_fila(columnas: Tuple[str, ...]):
+    # One namedtuple class per column shape, shared by every query that returns it
+    return namedtuple('Fila', columnas, rename=True)
+
+# Cache miss marker; None and [] are valid cached results
+_FALTA = object()
+
+# Connect errors that mean the server could not be reached. Anything else (bad credentials, unknown
+# database) is a configuration problem that retries and the circuit breaker cannot fix.
+ERRNOS_CONEXION = frozenset({
+    errorcode.CR_CONNECTION_ERROR, errorcode.CR_CONN_HOST_ERROR, errorcode.CR_UNKNOWN_HOST,
+    errorcode.CR_SERVER_GONE_ERROR, errorcode.CR_SERVER_LOST, errorcode.CR_SERVER_LOST_EXTENDED,
+    errorcode.ER_CON_COUNT_ERROR, errorcode.ER_BAD_HOST_ERROR, errorcode.ER_SERVER_SHUTDOWN,
+})
+
+# Columns each table accepts as filter keys; anything else is rejected before it reaches the SQL
+COLUMNAS_FILTRO = {
+    'maquinas': frozenset({'id', 'nombre', 'categoria', 'estado', 'ultimo_mantenimiento', 'codigo_qr',
+                           'supervisor_id', 'ubicacion'}),
+    'supervisores': frozenset({'id', 'nombre', 'email', 'telefono', 'permiso'}),
+    'prestamos': frozenset({'id', 'maquina_id', 'supervisor_id', 'fecha_prestamo', 'fecha_devolucion',
+                            'estado', 'codigo_prestamo'}),
+    'auditoria': frozenset({'tabla_afectada', 'accion', 'usuario_id'}),
+}
+
+@lru_cache(maxsize=256)
+def compilar_filtros(tabla: str, alias: str, forma: Tuple[Tuple[str, bool], ...]) -> str:
+    # forma is ((column, is_null), ...); compiled once per filter shape and table
+    if not forma:
+        return ""
+    permitidas = COLUMNAS_FILTRO[tabla]
+    prefix = f"{alias}." if alias else ""
+    where_clauses = []
+    for columna, es_nulo in forma:
+        if columna not in permitidas:
+            raise ValueError(f"Invalid filter column for {tabla}: {columna}")
+        where_clauses.append(f"{prefix}{columna} IS NULL" if es_nulo else f"{prefix}{columna} = %s")
+    return " WHERE " + " AND ".join(where_clauses)
+
+@lru_cache(maxsize=128)
+def compilar_pagina(base: str, where: str, columnas: Tuple[str, ...], seek: bool, descendente: bool) -> str:
+    if seek:
+        operador = '<' if descendente else '>'
+        # (a, b) > (x, y) written out as OR terms, which MySQL can resolve with an index range
+        terminos = []
+        for i, columna in enumerate(columnas):
+            partes = [f"{c} = %s" for c in columnas[:i]] + [f"{columna} {operador} %s"]
+            terminos.append("(" + " AND ".join(partes) + ")")
+        where += (" AND " if where else " WHERE ") + "(" + " OR ".join(terminos) + ")"
+    direccion = "DESC" if descendente else "ASC"
+    return base + where + " ORDER BY " + ", ".join(f"{c} {direccion}" for c in columnas) + " LIMIT %s"
+
+@lru_cache(maxsize=256)
+def compilar_consulta(base: str, where: str, sufijo: str = "") -> str:
+    # Returns the same string object for the same shape, which is what lets a prepared cursor
+    # skip re-preparing it
+    return base + where + sufijo
 
 class DatabaseManager:
     def __init__(self, config_path: str = 'config/db_config.json'):
         self.config = self._load_config(config_path)
-        self.connection = self._create_connection()
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self.stats = QueryStats(float(self.config.get('slow_query_ms', 500)))
+        self.breaker = CircuitBreaker(int(self.config.get('breaker_threshold', 5)),
+                                      float(self.config.get('breaker_reset_seconds', 30)))
+        self.read_retries = int(self.config.get('read_retries', 3))
+        self.retry_delay = float(self.config.get('retry_delay', 0.25))
+        # Single-connection mode: set after a connection-level error, cleared by the next reconnect
+        self._reconnect_needed = False
+        # Reference data (supervisors, locations, suppliers) is read on every refresh but rarely written
+        self.cache = TTLCache(int(self.config.get('cache_size', 256)), float(self.config.get('cache_ttl_seconds', 300)))
+        # Prepared cursors per connection, keyed by SQL; they die with their connection
+        self.prepared_cache_size = int(self.config.get('prepared_cache_size', 32))
+        self._preparados = weakref.WeakKeyDictionary()
+        self._preparados_lock = threading.Lock()
+        pool_size = int(self.config.get('pool_size', 0))
+        if pool_size > 0:
+            # Pooled mode: every read/write borrows its own connection, so calls are safe from worker threads
+            self.connection = None
+            self.pool = ConnectionPool(self._create_connection, pool_size, float(self.config.get('pool_timeout', 10)))
+            print(f"[INFO] Database connection pool ready (size {pool_size}).")
+        else:
+            self.pool = None
+            self.connection = self._create_connection()
         self._initialize_database()
 
     def _load_config(self, config_path: str) -> Dict:
@@ -28,148 +124,340 @@ class DatabaseManager:
                 database=self.config['database'],
                 autocommit=True
             )
-            if connection.is_connected():
+            if connection.is_connected() and self.pool is None:
                 print("[INFO] Database connection established.")
             return connection
         except Error as e:
-            raise Exception(f"Error connecting to the database: {e}")
+            if e.errno in ERRNOS_CONEXION:
+                # Connection-level, so the circuit breaker and read retries treat it like a dropped link
+                raise OperationalError(f"Error connecting to the database: {e}", errno=e.errno)
+            raise
+
+    def _in_transaction(self) -> bool:
+        return getattr(self._local, 'connection', None) is not None
+
+    @contextmanager
+    def _checkout(self):
+        # A transaction pins its connection to the calling thread until commit/rollback
+        pinned = getattr(self._local, 'connection', None)
+        if pinned is not None:
+            yield pinned
+            return
+
+        if not self.breaker.allow():
+            raise OperationalError(f"Database unavailable; next attempt in {self.breaker.seconds_until_retry():.0f}s")
+
+        # No liveness ping: connections are assumed healthy until a statement fails at the
+        # connection level, and only then reconnected (single mode) or replaced (pool)
+        broken = False
+        if self.pool is None:
+            with self._lock:
+                try:
+                    if self._reconnect_needed:
+                        self._forget_prepared(self.connection)
+                        self.connection.reconnect()
+                        self._reconnect_needed = False
+                    yield self.connection
+                except (OperationalError, InterfaceError):
+                    broken = True
+                    self._reconnect_needed = True
+                    raise
+                finally:
+                    self._record_health(broken)
+            return
+
+        connection = self._acquire()
+        try:
+            yield connection
+        except (OperationalError, InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._record_health(broken)
+            if broken:
+                self._forget_prepared(connection)
+                self.pool.discard(connection)
+            else:
+                self.pool.release(connection)
+
+    def _acquire(self):
+        # Pool checkout. A connection that cannot be opened, or a pool timeout, counts against the
+        # breaker; any other error means the server answered. Either way a half-open trial ends here.
+        try:
+            return self.pool.acquire()
+        except Error as e:
+            self._record_health(isinstance(e, (OperationalError, InterfaceError, PoolError)))
+            raise
+
+    def _record_health(self, broken: bool):
+        if broken:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _retry(self, operation, idempotent: bool = True):
+        # Idempotent reads are retried on connection-level errors with exponential backoff.
+        # Writes are retried only when the server was already gone before the statement was
+        # sent (CR_SERVER_GONE_ERROR), so they cannot be applied twice. Nothing is retried
+        # inside a transaction, whose pinned connection is the one that failed.
+        attempt = 1
+        while True:
+            try:
+                return operation()
+            except (OperationalError, InterfaceError) as e:
+                retriable = idempotent or e.errno == errorcode.CR_SERVER_GONE_ERROR
+                attempts = self.read_retries if idempotent else 2
+                if not retriable or attempt >= attempts or self._in_transaction() or self.breaker.is_open:
+                    raise
+                delay = self.retry_delay * (2 ** (attempt - 1))
+                print(f"[WARNING] Database connection error ({e}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    @contextmanager
+    def _instrument(self, query: str, metodo: str = None):
+        # Times the whole call, pool wait included; the caller fills in medicion['filas']
+        medicion = {'filas': 0}
+        metodo = metodo or metodo_llamador(__name__)
+        inicio = time.perf_counter()
+        error = False
+        try:
+            yield medicion
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.stats.record(query, time.perf_counter() - inicio, medicion['filas'], error, metodo)
+
+    def obtener_metricas_consultas(self) -> Dict:
+        return self.stats.snapshot()
 
     def _execute_write(self, query: str, params: tuple) -> bool:
+        return self._execute_update(query, params) is not None
+
+    def _execute_update(self, query: str, params: tuple) -> Optional[int]:
+        # Like _execute_write, but returns the number of affected rows, or None when the write failed
+        def _write():
+            with self._instrument(query) as medicion, self._checkout() as connection:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(query, params)
+                        medicion['filas'] = cursor.rowcount
+                    if not self._in_transaction():
+                        connection.commit()
+                    return medicion['filas']
+                except Error:
+                    if not self._in_transaction():
+                        connection.rollback()
+                    raise
         try:
-            if not self.connection.is_connected():
-                self.connection.reconnect()
-            with self.connection.cursor() as cursor:
-                cursor.execute(query, params)
-                self.connection.commit()
-                return True
+            return self._retry(_write, idempotent=False)
+        except Error as e:
+            print(f"[ERROR] Database write error: {e}")
+            return None
+
+    def _execute_write_many(self, query: str, params_list: List[tuple]) -> bool:
+        def _write():
+            with self._instrument(query) as medicion, self._checkout() as connection:
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.executemany(query, params_list)
+                        medicion['filas'] = cursor.rowcount
+                    if not self._in_transaction():
+                        connection.commit()
+                    return True
+                except Error:
+                    if not self._in_transaction():
+                        connection.rollback()
+                    raise
+        try:
+            return self._retry(_write, idempotent=False)
         except Error as e:
             print(f"[ERROR] Database write error: {e}")
-            self.connection.rollback()
             return False
 
-    def _execute_read(self, query: str, params: tuple = None) -> List[Dict]:
+    def _execute_read(self, query: str, params: tuple = None, compacto: bool = False,
+                      preparado: bool = False) -> List[Dict]:
+        # compacto=True returns namedtuples (attribute access) instead of one dict per row.
+        # preparado=True runs the query as a server-side prepared statement; pass SQL from
+        # compilar_consulta so repeated calls hand over the same string.
         try:
-            if not self.connection.is_connected():
-                self.connection.reconnect()
-            with self.connection.cursor(dictionary=True) as cursor:
-                cursor.execute(query, params or ())
-                return cursor.fetchall()
+            return self._query(query, params, compacto, preparado)
         except Error as e:
             print(f"[ERROR] Database read error: {e}")
             return []
 
+    def _query(self, query: str, params: tuple = None, compacto: bool = False,
+               preparado: bool = False) -> List[Dict]:
+        # Like _execute_read, but raises instead of returning [], for callers that must tell
+        # an empty result from a failed one
+        def _read():
+            if preparado and self.prepared_cache_size > 0:
+                return self._read_prepared(query, params, compacto)
+            with self._instrument(query) as medicion, self._checkout() as connection:
+                with connection.cursor(dictionary=not compacto) as cursor:
+                    cursor.execute(query, params or ())
+                    rows = cursor.fetchall()
+                    medicion['filas'] = len(rows)
+                    if compacto:
+                        return list(map(tipo_fila(tuple(cursor.column_names))._make, rows))
+                    return rows
+        return self._retry(_read)
+
+    def _read_cached(self, clave: Tuple, query: str, params: tuple = None, compacto: bool = False,
+                     preparado: bool = False, estricto: bool = False) -> List[Dict]:
+        # Read-through cache keyed by (table, ...). Failed reads are not cached and return [],
+        # or raise with estricto=True. Cached rows are shared between callers, so treat them as read-only.
+        filas = self.cache.get(clave, _FALTA)
+        if filas is not _FALTA:
+            return list(filas)
+        generacion = self.cache.generacion(clave[0])
+        try:
+            filas = self._query(query, params, compacto, preparado)
+        except Error as e:
+            if estricto:
+                raise
+            print(f"[ERROR] Database read error: {e}")
+            return []
+        self.cache.set(clave, filas, generacion)
+        return list(filas)
+
+    def invalidar_cache(self, tabla: str = None):
+        if tabla is None:
+            self.cache.clear()
+        else:
+            self.cache.invalidate(tabla)
+
+    def _read_prepared(self, query: str, params: tuple, compacto: bool) -> List[Dict]:
+        with self._instrument(query) as medicion, self._checkout() as connection:
+            cursor = self._prepared_cursor(connection, query)
+            try:
+                cursor.execute(query, params or ())
+                rows = cursor.fetchall()
+            except Error:
+                self._discard_prepared(connection, query)
+                raise
+            medicion['filas'] = len(rows)
+            columnas = tuple(cursor.column_names)
+            if compacto:
+                return list(map(tipo_fila(columnas)._make, rows))
+            return [dict(zip(columnas, row)) for row in rows]
+
+    def _prepared_cursor(self, connection, query: str):
+        # The connector only skips re-preparing when execute() receives the very string object it
+        # prepared last, so each SQL shape gets its own cursor on each connection
+        with self._preparados_lock:
+            cursores = self._preparados.get(connection)
+            if cursores is None:
+                cursores = self._preparados[connection] = OrderedDict()
+        # Only the thread holding the connection touches its cursors
+        cursor = cursores.get(query)
+        if cursor is not None:
+            cursores.move_to_end(query)
+            return cursor
+        cursor = connection.cursor(prepared=True)
+        cursores[query] = cursor
+        if len(cursores) > self.prepared_cache_size:
+            _, antiguo = cursores.popitem(last=False)
+            self._close_cursor(antiguo)
+        return cursor
+
+    def _discard_prepared(self, connection, query: str):
+        cursores = self._preparados.get(connection)
+        if cursores is not None and query in cursores:
+            self._close_cursor(cursores.pop(query))
+
+    def _forget_prepared(self, connection):
+        # After a reconnect the server has dropped every statement of the old session
+        with self._preparados_lock:
+            self._preparados.pop(connection, None)
+
+    def _close_cursor(self, cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+    def _iterate_read(self, query: str, params: tuple = None, batch_size: int = 1000,
+                      compacto: bool = False) -> Iterator[Dict]:
+        # The generator body only starts on the first next(), after the public iterar_* method
+        # has returned, so the calling method is resolved here
+        return self._stream_read(query, params, batch_size, compacto, metodo_llamador(__name__))
+
+    def _stream_read(self, query: str, params: tuple, batch_size: int, compacto: bool, metodo: str) -> Iterator[Dict]:
+        # Streams rows from the server with an unbuffered cursor, batch_size at a time. The
+        # connection stays checked out until the generator is exhausted or closed, so do not
+        # run other queries from the same thread while iterating. Errors propagate to the
+        # consumer, which would otherwise take a cut-off stream for the whole table.
+        with self._instrument(query, metodo) as medicion, self._checkout() as connection:
+            cursor = connection.cursor(dictionary=not compacto, buffered=False)
+            try:
+                cursor.execute(query, params or ())
+                fila = tipo_fila(tuple(cursor.column_names))._make if compacto else None
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    medicion['filas'] += len(rows)
+                    yield from (map(fila, rows) if compacto else rows)
+            finally:
+                # A consumer that stops early leaves rows on the wire; drain them so the
+                # connection can be reused
+                if connection.unread_result:
+                    connection.consume_results()
+                cursor.close()
+
+    def _sql_filters(self, tabla: str, alias: str, filters: Dict = None):
+        # None filters compile to IS NULL and take no parameter
+        if not filters:
+            return "", []
+        forma = tuple((key, value is None) for key, value in filters.items())
+        params = [value for value in filters.values() if value is not None]
+        return compilar_filtros(tabla, alias, forma), params
+
+    def _read_page(self, query: str, where: str, params: List, orden: List[Tuple[str, str]],
+                   limite: int, cursor: str = None, descendente: bool = False, compacto: bool = False) -> Dict:
+        # Keyset pagination: seek past the last row of the previous page instead of using OFFSET,
+        # so every page costs the same. orden is [(sql column, row key)] and must end in a unique key.
+        # Raises on failure: an empty page would read as the end of the table.
+        params = list(params)
+        columnas = tuple(c for c, _ in orden)
+        if cursor:
+            valores = self._decode_cursor(cursor, len(orden))
+            # One prefix of the cursor values per OR term of the seek predicate (see compilar_pagina)
+            for i in range(len(orden)):
+                params.extend(valores[:i + 1])
+        params.append(limite + 1)
+
+        query = compilar_pagina(query, where, columnas, bool(cursor), descendente)
+        filas = self._query(query, tuple(params), compacto, preparado=True)
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            siguiente = self._encode_cursor([getattr(ultima, clave) if compacto else ultima[clave]
+                                             for _, clave in orden])
+        return {'filas': filas, 'cursor': siguiente}
+
+    def _encode_cursor(self, valores: List) -> str:
+        return base64.urlsafe_b64encode(json.dumps(valores, default=str).encode('utf-8')).decode('ascii')
+
+    def _decode_cursor(self, cursor: str, columnas: int) -> List:
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, TypeError):
+            raise ValueError("Invalid page cursor.")
+        if not isinstance(valores, list) or len(valores) != columnas:
+            raise ValueError("Invalid page cursor.")
+        return valores
+
     def _initialize_database(self):
         try:
-            with self.connection.cursor() as cursor:
-                # Create tables if they don't exist
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS maquinas (
-                        id VARCHAR(36) PRIMARY KEY,
-                        nombre VARCHAR(255) NOT NULL,
-                        categoria VARCHAR(100),
-                        estado ENUM('disponible', 'en_uso', 'mantenimiento'),
-                        ultimo_mantenimiento DATE,
-                        codigo_qr VARCHAR(255),
-                        supervisor_id VARCHAR(36)
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS supervisores (
-                        id VARCHAR(36) PRIMARY KEY,
-                        nombre VARCHAR(255) NOT NULL,
-                        email VARCHAR(255) UNIQUE,
-                        telefono VARCHAR(20),
-                        permiso ENUM('basico', 'avanzado', 'admin'),
-                        fecha_registro DATETIME
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS prestamos (
-                        id VARCHAR(36) PRIMARY KEY,
-                        maquina_id VARCHAR(36) NOT NULL,
-                        supervisor_id VARCHAR(36) NOT NULL,
-                        fecha_prestamo DATETIME NOT NULL,
-                        fecha_devolucion DATETIME,
-                        observaciones TEXT,
-                        FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
-                        FOREIGN KEY (supervisor_id) REFERENCES supervisores(id)
-                    )
-                """)
-                self.connection.commit()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS alertas (
-                        id VARCHAR(36) PRIMARY KEY,
-                        maquina_id VARCHAR(36) NOT NULL,
-                        tipo VARCHAR(50) NOT NULL,
-                        descripcion TEXT,
-                        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        resuelta BOOLEAN DEFAULT FALSE,
-                        FOREIGN KEY (maquina_id) REFERENCES maquinas(id)
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS auditoria (
-                        id VARCHAR(36) PRIMARY KEY,
-                        tabla_afectada VARCHAR(100) NOT NULL,
-                        accion VARCHAR(50) NOT NULL,
-                        usuario_id VARCHAR(36) NOT NULL,
-                        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        datos_anteriores TEXT,
-                        datos_nuevos TEXT
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS historial_movimientos (
-                        id VARCHAR(36) PRIMARY KEY,
-                        maquina_id VARCHAR(36) NOT NULL,
-                        ubicacion_anterior VARCHAR(100),
-                        ubicacion_nueva VARCHAR(100) NOT NULL,
-                        fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        supervisor_id VARCHAR(36) NOT NULL,
-                        FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
-                        FOREIGN KEY (supervisor_id) REFERENCES supervisores(id)
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS mantenimientos (
-                        id VARCHAR(36) PRIMARY KEY,
-                        maquina_id VARCHAR(36) NOT NULL,
-                        fecha_programada DATE NOT NULL,
-                        fecha_realizacion DATE,
-                        proveedor_id VARCHAR(36),
-                        costo DECIMAL(10,2),
-                        descripcion TEXT,
-                        FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
-                        FOREIGN KEY (proveedor_id) REFERENCES proveedores(id)
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS proveedores (
-                        id VARCHAR(36) PRIMARY KEY,
-                        nombre VARCHAR(255) NOT NULL,
-                        contacto VARCHAR(255),
-                        telefono VARCHAR(20),
-                        email VARCHAR(255) UNIQUE
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS ubicaciones (
-                        id VARCHAR(36) PRIMARY KEY,
-                        nombre VARCHAR(255) NOT NULL,
-                        descripcion TEXT,
-                        capacidad INT
-                    )
-                """)
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS usuarios (
-                        id VARCHAR(36) PRIMARY KEY,
-                        username VARCHAR(255) UNIQUE NOT NULL,
-                        password_hash VARCHAR(255) NOT NULL,
-                        rol VARCHAR(50) NOT NULL,
-                        fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                print("[INFO] Database initialized successfully.")
+            with self._checkout() as connection:
+                applied = MigrationRunner(connection).run()
+            if applied:
+                print(f"[INFO] Database migrated to version {applied[-1]}.")
+            print("[INFO] Database initialized successfully.")
         except Error as e:
             raise Exception(f"Error initializing the database: {e}")
 
@@ -194,26 +482,105 @@ class DatabaseManager:
     def obtener_maquinas_disponibles(self) -> List[Dict]:
         return self.obtener_maquinas({'estado': 'disponible'})
 
-    def obtener_maquinas(self, filters: Dict = None) -> List[Dict]:
+    def _select_maquinas(self, incluir_supervisor: bool = False) -> str:
         query = """
             SELECT
-                id AS `id`,
-                nombre AS `nombre`,
-                categoria AS `categoria`,
-                estado AS `estado`,
-                ultimo_mantenimiento AS `ultimo_mantenimiento`,
-                supervisor_id,
-                ubicacion
-            FROM maquinas
+                m.id AS `id`,
+                m.nombre AS `nombre`,
+                m.categoria AS `categoria`,
+                m.estado AS `estado`,
+                m.ultimo_mantenimiento AS `ultimo_mantenimiento`,
+                m.codigo_qr,
+                m.supervisor_id,
+                m.ubicacion,
+                m.fecha_actualizacion
         """
-        params = []
-        if filters:
-            where_clauses = []
-            for key, value in filters.items():
-                where_clauses.append(f"{key} = %s")
-                params.append(value)
-            query += " WHERE " + " AND ".join(where_clauses)
-        return self._execute_read(query, tuple(params))
+        if incluir_supervisor:
+            # Resolve the supervisor name in the same round trip instead of one lookup per row
+            query += """,
+                s.nombre AS supervisor_nombre
+            FROM maquinas m
+            LEFT JOIN supervisores s ON s.id = m.supervisor_id
+            """
+        else:
+            query += " FROM maquinas m"
+        return query
+
+    def obtener_maquinas(self, filters: Dict = None, incluir_supervisor: bool = False,
+                         compacto: bool = False) -> List[Dict]:
+        where, params = self._sql_filters('maquinas', 'm', filters)
+        query = compilar_consulta(self._select_maquinas(incluir_supervisor), where)
+        return self._execute_read(query, tuple(params), compacto, preparado=True)
+
+    def iterar_maquinas(self, filters: Dict = None, incluir_supervisor: bool = False,
+                        batch_size: int = 1000, compacto: bool = False) -> Iterator[Dict]:
+        where, params = self._sql_filters('maquinas', 'm', filters)
+        return self._iterate_read(self._select_maquinas(incluir_supervisor) + where, tuple(params),
+                                  batch_size, compacto)
+
+    def obtener_maquinas_pagina(self, filters: Dict = None, limite: int = 200, cursor: str = None,
+                                incluir_supervisor: bool = False, compacto: bool = False) -> Dict:
+        where, params = self._sql_filters('maquinas', 'm', filters)
+        return self._read_page(self._select_maquinas(incluir_supervisor), where, params,
+                               [('m.id', 'id')], limite, cursor, compacto=compacto)
+
+    def obtener_marca_maquinas(self) -> Optional[datetime]:
+        # Served from idx_fecha_actualizacion without touching the rows. Raises on failure, like
+        # the delta below: a sync must not advance past changes it could not read.
+        result = self._query("SELECT MAX(fecha_actualizacion) AS marca FROM maquinas")
+        return result[0]['marca'] if result else None
+
+    def obtener_maquinas_cambiadas(self, desde: datetime, incluir_supervisor: bool = False,
+                                   compacto: bool = False) -> Dict:
+        # Inclusive bound: rows touched in the same second as the previous sync are sent again rather than missed
+        query = self._select_maquinas(incluir_supervisor) + " WHERE m.fecha_actualizacion >= %s"
+        cambiadas = self._query(query, (desde,), compacto)
+        tombstones = self._query("""
+            SELECT datos_anteriores, fecha
+            FROM auditoria
+            WHERE tabla_afectada = 'maquinas' AND accion = 'DELETE' AND fecha >= %s
+        """, (desde,))
+
+        eliminadas = []
+        for tombstone in tombstones:
+            try:
+                eliminadas.append(json.loads(tombstone['datos_anteriores'])['id'])
+            except (TypeError, ValueError, KeyError):
+                continue
+
+        marcas = [desde]
+        fechas = (m.fecha_actualizacion if compacto else m['fecha_actualizacion'] for m in cambiadas)
+        marcas += [fecha for fecha in fechas if fecha]
+        marcas += [t['fecha'] for t in tombstones if t['fecha']]
+        return {'cambiadas': cambiadas, 'eliminadas': eliminadas, 'marca': max(marcas)}
+
+    def eliminar_maquina(self, maquina_id: str) -> bool:
+        if not maquina_id:
+            raise ValueError("Machine ID is required.")
+        maquina = self.obtener_maquina_por_id(maquina_id)
+        if not maquina:
+            return False
+        def _delete():
+            # The audit row doubles as the tombstone incremental syncs use to drop the machine
+            return (self._execute_write("DELETE FROM maquinas WHERE id = %s", (maquina_id,)) and
+                    self._record_audit('maquinas', 'DELETE', datos_anteriores=maquina))
+        return self._run_in_transaction(_delete)
+
+    def _record_audit(self, tabla: str, accion: str, datos_anteriores: Dict = None,
+                      datos_nuevos: Dict = None, usuario_id: str = 'sistema') -> bool:
+        query = """
+            INSERT INTO auditoria (id, tabla_afectada, accion, usuario_id, datos_anteriores, datos_nuevos)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        params = (
+            str(uuid.uuid4()),
+            tabla,
+            accion,
+            usuario_id,
+            json.dumps(datos_anteriores, default=str) if datos_anteriores is not None else None,
+            json.dumps(datos_nuevos, default=str) if datos_nuevos is not None else None
+        )
+        return self._execute_write(query, params)
 
     def crear_supervisor(self, supervisor_data: Dict) -> bool:
         if not supervisor_data.get('id') or not supervisor_data.get('nombre') or not supervisor_data.get('email'):
@@ -230,76 +597,394 @@ class DatabaseManager:
             supervisor_data.get('permiso', 'basico'),
             datetime.now()
         )
-        return self._execute_write(query, params)
+        resultado = self._execute_write(query, params)
+        self.invalidar_cache('supervisores')
+        return resultado
 
-    def obtener_supervisores(self, filters: Dict = None) -> List[Dict]:
-        query = "SELECT id, nombre, email, telefono, permiso, fecha_registro FROM supervisores"
-        params = []
-        if filters:
-            where_clauses = []
-            for key, value in filters.items():
-                where_clauses.append(f"{key} = %s")
-                params.append(value)
-            query += " WHERE " + " AND ".join(where_clauses)
-        return self._execute_read(query, tuple(params))
+    def obtener_supervisores(self, filters: Dict = None, compacto: bool = False, estricto: bool = False) -> List[Dict]:
+        # estricto=True raises on failure instead of returning [], for callers that diff the list
+        where, params = self._sql_filters('supervisores', '', filters)
+        query = compilar_consulta(self._select_supervisores(), where)
+        clave = ('supervisores', 'lista', tuple(filters.items()) if filters else (), compacto)
+        return self._read_cached(clave, query, tuple(params), compacto, preparado=True, estricto=estricto)
+
+    def obtener_supervisores_pagina(self, filters: Dict = None, limite: int = 200, cursor: str = None,
+                                    compacto: bool = False) -> Dict:
+        where, params = self._sql_filters('supervisores', '', filters)
+        return self._read_page(self._select_supervisores(), where, params, [('id', 'id')], limite, cursor,
+                               compacto=compacto)
+
+    def _select_supervisores(self) -> str:
+        return "SELECT id, nombre, email, telefono, permiso, fecha_registro FROM supervisores"
 
     def obtener_supervisor_por_id(self, supervisor_id: str) -> Dict:
         if not supervisor_id:
             return None
         query = "SELECT id, nombre, email, telefono, permiso FROM supervisores WHERE id = %s"
-        result = self._execute_read(query, (supervisor_id,))
+        result = self._read_cached(('supervisores', 'id', supervisor_id), query, (supervisor_id,))
         return result[0] if result else None
 
+    def obtener_supervisores_por_ids(self, supervisor_ids: List[str]) -> Dict[str, Dict]:
+        ids = list(dict.fromkeys(i for i in supervisor_ids if i))
+        encontrados = {}
+        faltantes = []
+        for supervisor_id in ids:
+            filas = self.cache.get(('supervisores', 'id', supervisor_id), _FALTA)
+            if filas is _FALTA:
+                faltantes.append(supervisor_id)
+            elif filas:
+                encontrados[supervisor_id] = filas[0]
+        if not faltantes:
+            return encontrados
+
+        # Only the ids not already cached go to the server, and each answer is cached per id
+        generacion = self.cache.generacion('supervisores')
+        placeholders = ", ".join(["%s"] * len(faltantes))
+        query = f"SELECT id, nombre, email, telefono, permiso FROM supervisores WHERE id IN ({placeholders})"
+        try:
+            por_id = {row['id']: row for row in self._query(query, tuple(faltantes))}
+        except Error as e:
+            print(f"[ERROR] Database read error: {e}")
+            return encontrados
+        for supervisor_id in faltantes:
+            fila = por_id.get(supervisor_id)
+            self.cache.set(('supervisores', 'id', supervisor_id), [fila] if fila else [], generacion)
+            if fila:
+                encontrados[supervisor_id] = fila
+        return encontrados
+
+    def actualizar_supervisor(self, id: str, nombre: str, email: str, telefono: str, permiso: str,
+                              auth_provider: str = None) -> bool:
+        if not id or not nombre or not email:
+            raise ValueError("Supervisor ID, name, and email are required.")
+        query = """
+            UPDATE supervisores
+            SET nombre = %s, email = %s, telefono = %s, permiso = %s
+            WHERE id = %s
+        """
+        resultado = self._execute_write(query, (nombre, email, telefono, permiso, id))
+        self.invalidar_cache('supervisores')
+        return resultado
+
+    def eliminar_supervisor(self, supervisor_id: str) -> bool:
+        if not supervisor_id:
+            raise ValueError("Supervisor ID is required.")
+        resultado = self._execute_write("DELETE FROM supervisores WHERE id = %s", (supervisor_id,))
+        self.invalidar_cache('supervisores')
+        return resultado
+
+    def obtener_ubicaciones(self) -> List[Dict]:
+        query = "SELECT id, nombre, zona, descripcion, capacidad FROM ubicaciones ORDER BY nombre"
+        return self._read_cached(('ubicaciones', 'lista'), query)
+
+    def obtener_proveedores(self) -> List[Dict]:
+        query = "SELECT id, nombre, contacto, telefono, email FROM proveedores ORDER BY nombre"
+        return self._read_cached(('proveedores', 'lista'), query)
+
     def crear_prestamo(self, prestamo_data: Dict) -> bool:
-        if not prestamo_data.get('id') or not prestamo_data.get('maquina_id') or not prestamo_data.get('supervisor_id'):
-            raise ValueError("Loan ID, machine ID, and supervisor ID are required.")
+        return self.crear_prestamos_lote([prestamo_data])
+
+    def crear_prestamos_lote(self, prestamos: List[Dict]) -> bool:
+        if not prestamos:
+            return True
+        for prestamo_data in prestamos:
+            if not prestamo_data.get('id') or not prestamo_data.get('maquina_id') or not prestamo_data.get('supervisor_id'):
+                raise ValueError("Loan ID, machine ID, and supervisor ID are required.")
         query = """
             INSERT INTO prestamos (id, maquina_id, supervisor_id, fecha_prestamo, observaciones)
             VALUES (%s, %s, %s, %s, %s)
         """
-        params = (
-            prestamo_data.get('id'),
-            prestamo_data.get('maquina_id'),
-            prestamo_data.get('supervisor_id'),
-            datetime.now(),
-            prestamo_data.get('observaciones')
-        )
-        return self._execute_write(query, params)
+        fecha_prestamo = datetime.now()
+        params = [
+            (
+                prestamo_data.get('id'),
+                prestamo_data.get('maquina_id'),
+                prestamo_data.get('supervisor_id'),
+                fecha_prestamo,
+                prestamo_data.get('observaciones')
+            )
+            for prestamo_data in prestamos
+        ]
+        maquina_ids = tuple(prestamo_data['maquina_id'] for prestamo_data in prestamos)
+        placeholders = ", ".join(["%s"] * len(maquina_ids))
+        reservar = f"UPDATE maquinas SET estado = 'en_uso' WHERE id IN ({placeholders}) AND estado = 'disponible'"
+
+        def _lend():
+            # Claim the machines first: the row locks make a concurrent batch for any of them wait,
+            # and it then finds them no longer available. A machine taken (or listed twice) fails
+            # the whole batch.
+            if self._execute_update(reservar, maquina_ids) != len(maquina_ids):
+                print("[WARNING] Loan batch rejected: some machines are no longer available")
+                return False
+            # executemany turns the INSERT into a single multi-row statement
+            return self._execute_write_many(query, params)
+        return self._run_in_transaction(_lend)
 
     def finalizar_prestamo(self, prestamo_id: str) -> bool:
-        query = "UPDATE prestamos SET fecha_devolucion = %s WHERE id = %s"
-        params = (datetime.now(), prestamo_id)
-        return self._execute_write(query, params)
+        return self.finalizar_prestamos_lote([prestamo_id])
 
-    def obtener_prestamos(self, filters: Dict = None) -> List[Dict]:
-        query = """
+    def finalizar_prestamos_lote(self, prestamo_ids: List[str]) -> bool:
+        if not prestamo_ids:
+            return True
+        prestamo_ids = tuple(prestamo_ids)
+        placeholders = ", ".join(["%s"] * len(prestamo_ids))
+        # Machines first: the loan filter below stops matching once fecha_devolucion is set
+        liberar_maquinas = f"""
+            UPDATE maquinas SET estado = 'disponible'
+            WHERE id IN (SELECT maquina_id FROM prestamos WHERE id IN ({placeholders}) AND fecha_devolucion IS NULL)
+        """
+        cerrar_prestamos = f"""
+            UPDATE prestamos SET fecha_devolucion = %s, estado = 'completado'
+            WHERE id IN ({placeholders}) AND fecha_devolucion IS NULL
+        """
+        def _return():
+            return (self._execute_write(liberar_maquinas, prestamo_ids) and
+                    self._execute_write(cerrar_prestamos, (datetime.now(),) + prestamo_ids))
+        return self._run_in_transaction(_return)
+
+    def _select_prestamos(self) -> str:
+        return """
             SELECT p.*, m.nombre as maquina_nombre, s.nombre as supervisor_nombre 
             FROM prestamos p
             JOIN maquinas m ON p.maquina_id = m.id
             JOIN supervisores s ON p.supervisor_id = s.id
         """
+
+    def obtener_prestamos(self, filters: Dict = None, compacto: bool = False) -> List[Dict]:
+        where, params = self._sql_filters('prestamos', 'p', filters)
+        query = compilar_consulta(self._select_prestamos(), where)
+        return self._execute_read(query, tuple(params), compacto, preparado=True)
+
+    def obtener_prestamos_abiertos(self, compacto: bool = False) -> List[Dict]:
+        # Raises on failure instead of returning []: callers diff this list, and an empty answer
+        # would read as every loan having been returned
+        where, params = self._sql_filters('prestamos', 'p', {'fecha_devolucion': None})
+        query = compilar_consulta(self._select_prestamos(), where)
+        return self._query(query, tuple(params), compacto, preparado=True)
+
+    def iterar_prestamos(self, filters: Dict = None, batch_size: int = 1000, compacto: bool = False) -> Iterator[Dict]:
+        where, params = self._sql_filters('prestamos', 'p', filters)
+        return self._iterate_read(self._select_prestamos() + where + " ORDER BY p.fecha_prestamo", tuple(params),
+                                  batch_size, compacto)
+
+    def obtener_prestamos_pagina(self, filters: Dict = None, limite: int = 200, cursor: str = None,
+                                 compacto: bool = False) -> Dict:
+        # Newest loans first
+        where, params = self._sql_filters('prestamos', 'p', filters)
+        return self._read_page(self._select_prestamos(), where, params,
+                               [('p.fecha_prestamo', 'fecha_prestamo'), ('p.id', 'id')],
+                               limite, cursor, descendente=True, compacto=compacto)
+
+    def obtener_auditoria_pagina(self, usuario_id: str = None, tabla: str = None,
+                                 limite: int = 100, cursor: str = None) -> Dict:
+        filters = {}
+        if usuario_id is not None:
+            filters['usuario_id'] = usuario_id
+        if tabla is not None:
+            filters['tabla_afectada'] = tabla
+        where, params = self._sql_filters('auditoria', '', filters)
+        query = "SELECT id, tabla_afectada, accion, usuario_id, fecha, datos_anteriores, datos_nuevos FROM auditoria"
+        return self._read_page(query, where, params, [('fecha', 'fecha'), ('id', 'id')],
+                               limite, cursor, descendente=True)
+
+    def iterar_auditoria(self, desde: datetime = None, tabla: str = None, batch_size: int = 1000) -> Iterator[Dict]:
+        query = "SELECT id, tabla_afectada, accion, usuario_id, fecha, datos_anteriores, datos_nuevos FROM auditoria"
+        where_clauses = []
         params = []
-        if filters:
-            where_clauses = []
-            for key, value in filters.items():
-                where_clauses.append(f"p.{key} = %s")
-                params.append(value)
+        if desde is not None:
+            where_clauses.append("fecha >= %s")
+            params.append(desde)
+        if tabla is not None:
+            where_clauses.append("tabla_afectada = %s")
+            params.append(tabla)
+        if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
-        return self._execute_read(query, tuple(params))
+        return self._iterate_read(query + " ORDER BY fecha", tuple(params), batch_size)
+
+    def obtener_prestamo_activo(self, maquina_id: str, compacto: bool = False) -> Dict:
+        if not maquina_id:
+            return None
+        # Served by idx_prestamo_activo; a machine has at most one open loan
+        query = """
+            SELECT id, maquina_id, supervisor_id, fecha_prestamo, observaciones, estado
+            FROM prestamos
+            WHERE maquina_id = %s AND fecha_devolucion IS NULL
+            LIMIT 1
+        """
+        result = self._execute_read(query, (maquina_id,), compacto)
+        return result[0] if result else None
+
+    def obtener_prestamos_recientes(self, limite: int = 5) -> List[Dict]:
+        query = """
+            SELECT p.*, m.nombre as maquina_nombre, s.nombre as supervisor_nombre
+            FROM prestamos p
+            JOIN maquinas m ON p.maquina_id = m.id
+            JOIN supervisores s ON p.supervisor_id = s.id
+            ORDER BY p.fecha_prestamo DESC
+            LIMIT %s
+        """
+        return self._execute_read(query, (limite,))
+
+    def obtener_prestamos_vencidos(self, dias: int = 7) -> List[Dict]:
+        # "More than `dias` days" means the loan started at least dias + 1 days ago
+        query = """
+            SELECT p.*, m.nombre as maquina_nombre, s.nombre as supervisor_nombre
+            FROM prestamos p
+            JOIN maquinas m ON p.maquina_id = m.id
+            JOIN supervisores s ON p.supervisor_id = s.id
+            WHERE p.fecha_devolucion IS NULL AND p.fecha_prestamo <= NOW() - INTERVAL %s DAY
+        """
+        return self._execute_read(query, (dias + 1,))
+
+    def _read_dataframe(self, query: str, params: tuple = None, fechas: tuple = ()):
+        # Analytics path: plain tuples go straight into columns, no per-row dict. pandas is only
+        # imported by the callers that need it.
+        import pandas as pd
+        def _read():
+            with self._instrument(query) as medicion, self._checkout() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(query, params or ())
+                    rows = cursor.fetchall()
+                    medicion['filas'] = len(rows)
+                    return rows, list(cursor.column_names)
+        try:
+            rows, columnas = self._retry(_read)
+        except Error as e:
+            print(f"[ERROR] Database read error: {e}")
+            return pd.DataFrame()
+        df = pd.DataFrame.from_records(rows, columns=columnas)
+        for columna in fechas:
+            # NULL dates become NaT
+            df[columna] = pd.to_datetime(df[columna])
+        return df
+
+    def obtener_prestamos_df(self, desde: datetime = None):
+        # Loans open at any point since `desde`: still open, or returned after it. Both ranges
+        # are read from idx_fecha_devolucion (migration 005).
+        query = "SELECT id, maquina_id, supervisor_id, fecha_prestamo, fecha_devolucion FROM prestamos"
+        params = ()
+        if desde is not None:
+            query += " WHERE fecha_devolucion IS NULL OR fecha_devolucion >= %s"
+            params = (desde,)
+        return self._read_dataframe(query, params, fechas=('fecha_prestamo', 'fecha_devolucion'))
+
+    def obtener_estadisticas(self, dias_vencimiento: int = 7) -> Dict:
+        # Every dashboard aggregate in one round trip, as (grupo, clave, total) rows
+        query = """
+            SELECT 'estado' AS grupo, estado AS clave, COUNT(*) AS total FROM maquinas GROUP BY estado
+            UNION ALL
+            SELECT 'categoria', categoria, COUNT(*) FROM maquinas GROUP BY categoria
+            UNION ALL
+            SELECT 'prestamos_activos', NULL, COUNT(*) FROM prestamos WHERE fecha_devolucion IS NULL
+            UNION ALL
+            SELECT 'prestamos_vencidos', NULL, COUNT(*) FROM prestamos
+            WHERE fecha_devolucion IS NULL AND fecha_prestamo <= NOW() - INTERVAL %s DAY
+        """
+        estadisticas = {
+            'total': 0,
+            'por_estado': {},
+            'por_categoria': {},
+            'prestamos_activos': 0,
+            'prestamos_vencidos': 0
+        }
+        for row in self._execute_read(query, (dias_vencimiento + 1,)):
+            total = int(row['total'])
+            if row['grupo'] == 'estado':
+                estadisticas['por_estado'][row['clave']] = total
+                estadisticas['total'] += total
+            elif row['grupo'] == 'categoria':
+                estadisticas['por_categoria'][row['clave'] or 'Other'] = total
+            else:
+                estadisticas[row['grupo']] = total
+        return estadisticas
 
     def begin_transaction(self):
-        self.connection.start_transaction()
+        if not self.breaker.allow():
+            raise OperationalError(f"Database unavailable; next attempt in {self.breaker.seconds_until_retry():.0f}s")
+        for attempt in (1, 2):
+            if self.pool is None:
+                self._lock.acquire()
+                connection = self.connection
+            else:
+                connection = self._acquire()
+            try:
+                if self.pool is None and self._reconnect_needed:
+                    self._forget_prepared(connection)
+                    connection.reconnect()
+                    self._reconnect_needed = False
+                connection.start_transaction()
+            except Error as e:
+                broken = isinstance(e, (OperationalError, InterfaceError))
+                self._release_transaction(connection, broken=broken)
+                if broken and attempt == 1:
+                    # Nothing of the transaction was sent yet: replace the stale connection and start
+                    # again. Idle pool connections have sat as long, so they go too and the retry
+                    # opens a new one.
+                    print(f"[WARNING] Could not start transaction ({e}); retrying on a new connection")
+                    if self.pool is not None:
+                        self.pool.close_all()
+                    continue
+                self._record_health(broken)
+                raise
+            self._local.connection = connection
+            return
+
+    def _run_in_transaction(self, operation) -> bool:
+        # Runs operation() in one transaction and commits if it returns True. Like the single-row
+        # writes, a database that is down, an open breaker or a failed commit/rollback give False.
+        try:
+            self.begin_transaction()
+        except Error as e:
+            print(f"[ERROR] Database write error: {e}")
+            return False
+        try:
+            if operation():
+                self.commit_transaction()
+                return True
+        except Error as e:
+            print(f"[ERROR] Database write error: {e}")
+        finally:
+            # Still pinned unless the commit went through (or failed and released the connection)
+            if self._in_transaction():
+                try:
+                    self.rollback_transaction()
+                except Error as e:
+                    print(f"[ERROR] Database rollback error: {e}")
+        return False
 
     def commit_transaction(self):
-        self.connection.commit()
+        self._end_transaction('commit')
 
     def rollback_transaction(self):
-        self.connection.rollback()
+        self._end_transaction('rollback')
+
+    def _end_transaction(self, accion: str):
+        connection = self._local.connection
+        broken = False
+        try:
+            getattr(connection, accion)()
+        except (OperationalError, InterfaceError):
+            broken = True
+            raise
+        finally:
+            self._record_health(broken)
+            self._release_transaction(connection, broken=broken)
+
+    def _release_transaction(self, connection, broken: bool = False):
+        self._local.connection = None
+        if self.pool is None:
+            self._reconnect_needed = self._reconnect_needed or broken
+            self._lock.release()
+        elif broken:
+            self._forget_prepared(connection)
+            self.pool.discard(connection)
+        else:
+            self.pool.release(connection)
 
     def obtener_maquina_por_id(self, maquina_id: str) -> Dict:
         if not maquina_id:
             return None
-        query = "SELECT id, nombre, categoria, estado, ultimo_mantenimiento, supervisor_id, ubicacion FROM maquinas WHERE id = %s"
+        query = "SELECT id, nombre, categoria, estado, ultimo_mantenimiento, supervisor_id, ubicacion, fecha_actualizacion FROM maquinas WHERE id = %s"
         result = self._execute_read(query, (maquina_id,))
         return result[0] if result else None
 
@@ -321,13 +1006,16 @@ class DatabaseManager:
             VALUES (%s, %s, %s, %s, %s, %s)
         """
         params = (id, nombre, email, telefono, permiso, datetime.now())
-        return self._execute_write(query, params)
+        resultado = self._execute_write(query, params)
+        self.invalidar_cache('supervisores')
+        return resultado
 
     def obtener_maquinas_asignadas(self) -> List[Dict]:
         query = """
             SELECT 
                 m.id,
                 m.nombre,
+                p.id as prestamo_id,
                 s.nombre as supervisor,
                 p.fecha_prestamo as fecha_asignacion
             FROM maquinas m
@@ -348,7 +1036,15 @@ class DatabaseManager:
         params = (nombre, categoria, estado, ubicacion, supervisor_id, id)
         return self._execute_write(query, params)
 
+    def asignar_supervisor_maquina(self, maquina_id: str, supervisor_id: str) -> bool:
+        if not maquina_id:
+            raise ValueError("Machine ID is required.")
+        return self._execute_write("UPDATE maquinas SET supervisor_id = %s WHERE id = %s", (supervisor_id, maquina_id))
+
     def __del__(self):
-        if self.connection.is_connected():
+        if getattr(self, 'pool', None) is not None:
+            self.pool.close_all()
+            print("[INFO] Database connection pool closed.")
+        elif getattr(self, 'connection', None) is not None and self.connection.is_connected():
             self.connection.close()
             print("[INFO] Database connection closed.")
\ No newline at end of file
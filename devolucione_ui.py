@@ -1,7 +1,12 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QMessageBox, QComboBox, QFrame, QLineEdit, QLabel, QProgressBar
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QTableView, QAbstractItemView, QPushButton, QHeaderView, QMessageBox, QComboBox, QFrame, QLineEdit, QLabel, QProgressBar
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QColor
-from db_manager import DatabaseManager
+from inventory_repository import InventoryRepository
+from query_executor import QueryExecutor
+from table_sync import sincronizar_combo
+from filtered_table_model import FilteredTableModel, busqueda_diferida
+from datetime import datetime
+import csv
 
 CLOUD_STYLE = """
 QWidget {
@@ -11,7 +16,7 @@ QWidget {
     font-size: 15px;
 }
 
-QTableWidget {
+QTableView {
     background: #262626;
     gridline-color: #505050;
     border-radius: 6px;
@@ -29,12 +34,12 @@ QHeaderView::section {
     font-size: 16px;
 }
 
-QTableWidget::item {
+QTableView::item {
     border-bottom: 1px solid #505050;
     padding: 10px;
 }
 
-QTableWidget::item:selected {
+QTableView::item:selected {
     background-color: #0078D4;
     color: #ffffff;
 }
@@ -69,19 +74,44 @@ QComboBox {
 }
 """
 
+class DevolucionesTableModel(FilteredTableModel):
+    # Rows keyed by machine id (a machine has at most one open loan), searched by device name
+    PENDING_COLUMN = 3
+    STATUS_COLUMN = 4
+    PENDING_COLOR = QColor('#fff4ce')
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.HEADERS = headers
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if (index.isValid() and role == Qt.ItemDataRole.BackgroundRole
+                and self.valor(self.fila(index.row()), self.PENDING_COLUMN) == 'Pendiente'):
+            return self.PENDING_COLOR
+        return super().data(index, role)
+
 class DevolucionesUI(QWidget):
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, repo: InventoryRepository):
         super().__init__()
         self.setStyleSheet(CLOUD_STYLE)
-        self.db = db
+        self.repo = repo
+        self.executor = QueryExecutor(self)
         self.init_ui()
-        self.cargar_datos()
-        self.setup_auto_refresh()
 
-    def setup_auto_refresh(self):
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.cargar_datos)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
+        # Initial pages and bursts of deltas collapse into one redraw of the tables
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(50)
+        self.render_timer.timeout.connect(self.mostrar_datos)
+        for signal in (repo.maquinas_cambiadas, repo.maquinas_eliminadas, repo.prestamos_abiertos, repo.prestamos_cerrados):
+            signal.connect(self.render_timer.start)
+        repo.supervisores_cambiados.connect(self.mostrar_supervisores)
+        repo.error.connect(self.error_carga)
+
+        self.mostrar_datos()
+        if repo.supervisores is not None:
+            self.mostrar_supervisores(repo.supervisores)
+        self.cargar_datos()
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -113,7 +143,7 @@ class DevolucionesUI(QWidget):
         # Search and filters
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText('Search devices...')
-        self.search_input.textChanged.connect(self.filter_devices)
+        self.search_timer = busqueda_diferida(self.search_input, self.filter_devices)
         self.search_input.setStyleSheet("""
             QLineEdit {
                 background: #3D3D3D;
@@ -151,6 +181,8 @@ class DevolucionesUI(QWidget):
         
         for btn in [self.btn_procesar, self.btn_historial, self.btn_reporte]:
             toolbar_layout.addWidget(btn)
+        self.btn_procesar.clicked.connect(self.procesar_devoluciones)
+        self.btn_reporte.clicked.connect(self.generar_reporte)
 
         layout.addWidget(toolbar)
 
@@ -167,7 +199,8 @@ class DevolucionesUI(QWidget):
         available_label.setStyleSheet('color: white; font-size: 16px; font-weight: bold;')
         returns_section.addWidget(available_label)
 
-        self.tabla_disponibles = self.create_table(['ID', 'Device', 'Location', 'Last Used'])
+        self.modelo_disponibles = DevolucionesTableModel(['ID', 'Device', 'Location', 'Last Used'], self)
+        self.tabla_disponibles = self.create_table(self.modelo_disponibles)
         returns_section.addWidget(self.tabla_disponibles)
 
         # Assigned devices table
@@ -175,7 +208,9 @@ class DevolucionesUI(QWidget):
         assigned_label.setStyleSheet('color: white; font-size: 16px; font-weight: bold;')
         returns_section.addWidget(assigned_label)
 
-        self.tabla_asignadas = self.create_table(['ID', 'Device', 'Supervisor', 'Assignment Date', 'Status'])
+        self.modelo_asignadas = DevolucionesTableModel(['ID', 'Device', 'Supervisor', 'Assignment Date', 'Status'], self)
+        self.tabla_asignadas = self.create_table(self.modelo_asignadas)
+        self.tabla_asignadas.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         returns_section.addWidget(self.tabla_asignadas)
 
         content_layout.addLayout(returns_section)
@@ -259,8 +294,8 @@ class DevolucionesUI(QWidget):
                 }
             """)
 
-        btn_asignar.clicked.connect(lambda: self.move_item(self.tabla_disponibles, self.tabla_asignadas))
-        btn_liberar.clicked.connect(lambda: self.move_item(self.tabla_asignadas, self.tabla_disponibles))
+        btn_asignar.clicked.connect(lambda: self.move_item(self.tabla_disponibles))
+        btn_liberar.clicked.connect(lambda: self.move_item(self.tabla_asignadas))
 
         transfer_layout.addWidget(btn_asignar)
         transfer_layout.addWidget(btn_liberar)
@@ -324,73 +359,118 @@ class DevolucionesUI(QWidget):
         button_layout.addWidget(btn_asignar)
         button_layout.addWidget(btn_liberar)
         btn_scan.clicked.connect(self.handle_scan)
-        btn_asignar.clicked.connect(lambda: self.move_item(self.tabla_disponibles, self.tabla_asignadas))
-        btn_liberar.clicked.connect(lambda: self.move_item(self.tabla_asignadas, self.tabla_disponibles))
+        btn_asignar.clicked.connect(lambda: self.move_item(self.tabla_disponibles))
+        btn_liberar.clicked.connect(lambda: self.move_item(self.tabla_asignadas))
         return button_layout
 
-    def move_item(self, source, destination):
-        selected = source.currentRow()
-        if selected >= 0:
-            row_data = [source.item(selected, col).text() for col in range(source.columnCount())]
-            destination.insertRow(destination.rowCount())
-            for col, data in enumerate(row_data):
-                destination.setItem(destination.rowCount()-1, col, QTableWidgetItem(data))
-            source.removeRow(selected)
-            self.actualizar_asignacion_bd(row_data[0])
+    def move_item(self, source):
+        # Both tables redraw from the repository once the change is saved
+        index = source.currentIndex()
+        if index.isValid():
+            self.actualizar_asignacion_bd(source.model().fila(index.row())[0])
+
+    def procesar_devoluciones(self):
+        rows = sorted({index.row() for index in self.tabla_asignadas.selectionModel().selectedRows()})
+        if not rows:
+            self.mostrar_error("Selección requerida", "Seleccione uno o más dispositivos a devolver")
+            return
+        
+        prestamo_ids = []
+        sin_prestamo = []
+        for row in rows:
+            maquina_id = self.modelo_asignadas.fila(row)[0]
+            prestamo = self.repo.prestamo_activo(maquina_id)
+            if prestamo is None:
+                sin_prestamo.append(maquina_id)
+            else:
+                prestamo_ids.append(prestamo.id)
+        if not prestamo_ids:
+            self.mostrar_error("Error", "Ninguno de los dispositivos seleccionados tiene un préstamo activo")
+            return
+        # One transaction for the whole selection; the tables update from the repository sync
+        if not self.repo.cerrar_prestamos(prestamo_ids):
+            self.mostrar_error("Error", "No se pudieron procesar las devoluciones")
+            return
+        if sin_prestamo:
+            self.mostrar_error("Devolución parcial",
+                               f"Sin préstamo activo, no se devolvieron: {', '.join(sin_prestamo)}")
+        self.status_label.setText(f'{len(prestamo_ids)} return(s) processed')
+
+    def generar_reporte(self):
+        filename = f'loans_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        self.status_label.setText('Generating report...')
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.executor.submit('reporte', lambda: self.escribir_reporte(filename),
+                             self.reporte_generado, self.error_reporte)
+
+    def escribir_reporte(self, filename):
+        # Runs on a worker thread; loans are streamed to disk so memory stays flat
+        total = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Loan ID', 'Device ID', 'Device', 'Supervisor', 'Loan Date', 'Return Date', 'Status', 'Notes'])
+            for prestamo in self.repo.db.iterar_prestamos():
+                writer.writerow([
+                    prestamo['id'],
+                    prestamo['maquina_id'],
+                    prestamo['maquina_nombre'],
+                    prestamo['supervisor_nombre'],
+                    prestamo['fecha_prestamo'],
+                    prestamo['fecha_devolucion'] or '',
+                    prestamo.get('estado', ''),
+                    prestamo['observaciones'] or ''
+                ])
+                total += 1
+        return filename, total
+
+    def reporte_generado(self, resultado):
+        filename, total = resultado
+        self.progress_bar.hide()
+        self.status_label.setText(f'Report generated: {filename} ({total} loans)')
+
+    def error_reporte(self, mensaje):
+        self.progress_bar.hide()
+        self.status_label.setText('System Ready')
+        self.mostrar_error("Error", f"Could not generate report: {mensaje}")
 
     def handle_scan(self):
         machine_id = "SCANNED_ID"  # Placeholder for QR/barcode scanning logic
-        for row in range(self.tabla_disponibles.rowCount()):
-            if self.tabla_disponibles.item(row, 0).text() == machine_id:
-                self.move_item(self.tabla_disponibles, self.tabla_asignadas)
-                break
+        row = self.modelo_disponibles.filas_de({machine_id}).get(machine_id)
+        if row is not None:
+            self.tabla_disponibles.selectRow(row)
+            self.move_item(self.tabla_disponibles)
 
     def actualizar_asignacion_bd(self, machine_id):
         supervisor_id = self.combo_supervisores.currentData()
         if supervisor_id:
-            self.db.actualizar_supervisor(machine_id, supervisor_id)
+            self.repo.asignar_supervisor_maquina(machine_id, supervisor_id)
 
     def cargar_datos(self):
-        try:
-            # Load available machines
-            disponibles = self.db.obtener_maquinas_disponibles()
-            self.tabla_disponibles.setRowCount(len(disponibles))
-            for i, maq in enumerate(disponibles):
-                self.tabla_disponibles.setItem(i, 0, QTableWidgetItem(maq['id']))
-                self.tabla_disponibles.setItem(i, 1, QTableWidgetItem(maq['nombre']))
-                self.tabla_disponibles.setItem(i, 2, QTableWidgetItem(maq['ubicacion']))
-
-            # Load assigned machines
-            asignadas = self.db.obtener_maquinas_asignadas()
-            self.tabla_asignadas.setRowCount(len(asignadas))
-            for i, maq in enumerate(asignadas):
-                self.tabla_asignadas.setItem(i, 0, QTableWidgetItem(maq['id']))
-                self.tabla_asignadas.setItem(i, 1, QTableWidgetItem(maq['nombre']))
-                self.tabla_asignadas.setItem(i, 2, QTableWidgetItem(maq['supervisor']))
-                self.tabla_asignadas.setItem(i, 3, QTableWidgetItem(str(maq['fecha_asignacion'])))
-
-            # Load supervisors
-            self.combo_supervisores.clear()
-            supervisores = self.db.obtener_supervisores()
-            for sup in supervisores:
-                self.combo_supervisores.addItem(f"{sup['nombre']} ({sup['id']})", sup['id'])
+        self.repo.sincronizar()
 
+    def mostrar_datos(self):
+        # Drawn from the repository's memory; no database access here
+        try:
+            # Keyed diffs: only rows that were added, removed or changed reach the views,
+            # and the active search and filter apply to them as they arrive
+            self.modelo_disponibles.aplicar(
+                (maq.id, maq.nombre, maq.ubicacion or '') for maq in self.repo.maquinas_disponibles()
+            )
+            self.modelo_asignadas.aplicar(
+                (prestamo.maquina_id, prestamo.maquina_nombre, prestamo.supervisor_nombre, str(prestamo.fecha_prestamo))
+                for prestamo in self.repo.prestamos.values()
+            )
         except Exception as e:
             self.mostrar_error("Error de carga", f"Error al cargar datos: {str(e)}")
 
-        self.aplicar_estilos_filas()
+    def mostrar_supervisores(self, supervisores):
+        sincronizar_combo(self.combo_supervisores, [(f"{sup['nombre']} ({sup['id']})", sup['id']) for sup in supervisores])
 
-    def aplicar_estilos_filas(self):
-        for row in range(self.tabla_asignadas.rowCount()):
-            if self.tabla_asignadas.item(row, 3).text() == 'Pendiente':
-                for col in range(self.tabla_asignadas.columnCount()):
-                    self.tabla_asignadas.item(row, col).setBackground(QColor('#fff4ce'))
-
-    def mostrar_estado_vacio(self, mensaje):
-        self.tabla_asignadas.setRowCount(1)
-        self.tabla_asignadas.setItem(0, 0, QTableWidgetItem(mensaje))
-        self.tabla_asignadas.item(0, 0).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.tabla_asignadas.setSpan(0, 0, 1, 6)
+    def error_carga(self, mensaje):
+        if not self.isVisible():
+            return
+        self.mostrar_error("Error de carga", f"Error al cargar datos: {mensaje}")
 
     def mostrar_error(self, titulo, mensaje):
         msg = QMessageBox(self)
@@ -436,13 +516,15 @@ class DevolucionesUI(QWidget):
         
         return metric_frame
 
-    def create_table(self, headers):
-        table = QTableWidget()
-        table.setColumnCount(len(headers))
-        table.setHorizontalHeaderLabels(headers)
+    def create_table(self, model):
+        table = QTableView()
+        table.setModel(model)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Fixed row heights let the view skip measuring rows it never shows
+        table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background: #2c2c2c;
                 border: none;
                 border-radius: 8px;
@@ -455,7 +537,7 @@ class DevolucionesUI(QWidget):
                 color: white;
                 font-weight: bold;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 border-bottom: 1px solid #404040;
             }
@@ -463,16 +545,9 @@ class DevolucionesUI(QWidget):
         return table
 
     def filter_devices(self):
-        search_text = self.search_input.text().lower()
+        search_text = self.search_input.text()
         status = self.status_filter.currentText()
-        
-        for row in range(self.tabla_disponibles.rowCount()):
-            device = self.tabla_disponibles.item(row, 1).text().lower()
-            should_show = search_text in device
-            self.tabla_disponibles.setRowHidden(row, not should_show)
-        
-        for row in range(self.tabla_asignadas.rowCount()):
-            device = self.tabla_asignadas.item(row, 1).text().lower()
-            device_status = self.tabla_asignadas.item(row, 4).text() if self.tabla_asignadas.item(row, 4) else ''
-            should_show = search_text in device and (status == 'All Status' or status == device_status)
-            self.tabla_asignadas.setRowHidden(row, not should_show)
\ No newline at end of file
+        self.modelo_disponibles.filtrar(search_text, {})
+        self.modelo_asignadas.filtrar(
+            search_text, {} if status == 'All Status' else {DevolucionesTableModel.STATUS_COLUMN: status}
+        )
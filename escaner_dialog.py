@@ -0,0 +1,87 @@
+from typing import Any, Callable, Dict, Optional
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QDialogButtonBox, QListWidget
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage, QPixmap
+from design_system import CLOUD_STYLE
+from scanner_worker import ScannerWorker
+
+# Workers still closing the camera after their dialog closed; referenced until they finish
+_cerrando = set()
+
+class EscanerDialog(QDialog):
+    # A camera can take seconds to open or release; closing the dialog does not wait for it
+    STOP_TIMEOUT_MS = 2000
+
+    def __init__(self, parent=None, continuo: bool = False,
+                 resolver: Callable[[str], Optional[Any]] = None, **scanner_options):
+        super().__init__(parent)
+        self.setWindowTitle("Escáner QR/Código de Barras")
+        self.setStyleSheet(CLOUD_STYLE)
+        self.continuo = continuo
+        self.resolver = resolver
+        self.codigo = None
+        self.error = None
+        # Continuous mode: recognized devices in scan order, keyed by machine id
+        self.maquinas: Dict[str, Any] = {}
+        self.init_ui()
+
+        if continuo:
+            # A cart holds codes all over the frame, so decode the whole image by default
+            scanner_options.setdefault('roi', 1.0)
+        self.worker = ScannerWorker(**scanner_options)
+        self.worker.frame_ready.connect(self.mostrar_frame)
+        self.worker.codigo_detectado.connect(self.codigo_detectado)
+        self.worker.error.connect(self.error_camara)
+        self.worker.start()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        self.preview_label = QLabel('Iniciando cámara...')
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setMinimumSize(640, 480)
+        layout.addWidget(self.preview_label)
+
+        if self.continuo:
+            self.contador_label = QLabel('Dispositivos escaneados: 0')
+            self.lista_escaneados = QListWidget()
+            self.lista_escaneados.setMaximumHeight(160)
+            layout.addWidget(self.contador_label)
+            layout.addWidget(self.lista_escaneados)
+            buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+            buttons.button(QDialogButtonBox.StandardButton.Ok).setText('Finalizar')
+            buttons.accepted.connect(self.accept)
+        else:
+            buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Cancel)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def mostrar_frame(self, image: QImage):
+        self.preview_label.setPixmap(QPixmap.fromImage(image))
+
+    def codigo_detectado(self, codigo: str):
+        if not self.continuo:
+            if self.codigo is None:
+                self.codigo = codigo
+                self.accept()
+            return
+
+        maquina = self.resolver(codigo) if self.resolver else None
+        if maquina is None:
+            self.lista_escaneados.insertItem(0, f"✗ {codigo}: no encontrado o no disponible")
+        elif maquina.id not in self.maquinas:
+            self.maquinas[maquina.id] = maquina
+            self.lista_escaneados.insertItem(0, f"✓ {maquina.id} - {maquina.nombre}")
+            self.contador_label.setText(f'Dispositivos escaneados: {len(self.maquinas)}')
+
+    def error_camara(self, mensaje: str):
+        self.error = mensaje
+        self.reject()
+
+    def done(self, result):
+        self.worker.stop()
+        if not self.worker.wait(self.STOP_TIMEOUT_MS):
+            print("[WARNING] Camera still closing; the scanner will stop in the background")
+            worker = self.worker
+            _cerrando.add(worker)
+            worker.finished.connect(lambda: _cerrando.discard(worker))
+        super().done(result)
@@ -0,0 +1,236 @@
+from operator import itemgetter
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from PyQt6.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex
+from PyQt6.QtWidgets import QLineEdit
+from search_index import SearchIndex
+
+SEARCH_DELAY_MS = 150
+
+def busqueda_diferida(campo: QLineEdit, buscar: Callable[[], None], retraso_ms: int = SEARCH_DELAY_MS) -> QTimer:
+    # Keystrokes restart the timer; the search runs once typing pauses
+    timer = QTimer(campo)
+    timer.setSingleShot(True)
+    timer.setInterval(retraso_ms)
+    timer.timeout.connect(buscar)
+    campo.textChanged.connect(timer.start)
+    return timer
+
+class FilteredTableModel(QAbstractTableModel):
+    # Rows are tuples keyed by their first value. Search, filters and sorting are worked out here
+    # on plain lists and reach the view as one layout change; a QSortFilterProxyModel calls back
+    # into Python once per row on every keystroke, which takes seconds on large tables.
+    HEADERS: List[str] = []
+    # Column the search box matches against
+    SEARCH_COLUMN = 1
+    # Below this share of matching rows, the visible rows are built from the matches alone
+    SELECTIVA = 0.1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows: List[tuple] = []
+        self.posiciones: Dict[Hashable, int] = {}
+        # Indices into rows, filtered and sorted: view row n shows rows[visibles[n]]
+        self.visibles: List[int] = []
+        self.indice = SearchIndex()
+        # column -> value a row must have there
+        self.filtros: Dict[int, str] = {}
+        self.orden: Optional[Tuple[int, Qt.SortOrder]] = None
+        # Every row in sort order; kept until rows are added/removed or the sort changes
+        self._ordenadas: Optional[List[int]] = None
+
+    def valor(self, row: tuple, column: int):
+        # Columns past the end of a row (actions, status not yet tracked) read as empty
+        return row[column] if column < len(row) else ''
+
+    def cumple_filtros(self, row: tuple) -> bool:
+        # A filter on a column the row does not have never matches
+        return all(row[col:col + 1] == (valor,) for col, valor in self.filtros.items())
+
+    def acepta(self, row: tuple) -> bool:
+        return self.indice.coincide(row[0]) and self.cumple_filtros(row)
+
+    def filtro_externo(self) -> Callable[[tuple], bool]:
+        # The current search and filters as a check for rows that are not in the model (streamed
+        # exports). It works on a copy of them, so it can run on a worker thread.
+        consulta, columna = self.indice.consulta, self.SEARCH_COLUMN
+        filtros = [(col, (valor,)) for col, valor in self.filtros.items()]
+
+        def acepta(row: tuple) -> bool:
+            if consulta and consulta not in str(row[columna]).lower():
+                return False
+            return all(row[col:col + 1] == buscado for col, buscado in filtros)
+        return acepta
+
+    def set_rows(self, rows: List[tuple]):
+        self.beginResetModel()
+        self.rows = list(rows)
+        self.posiciones = {row[0]: i for i, row in enumerate(self.rows)}
+        self.indice.sincronizar((row[0], self.valor(row, self.SEARCH_COLUMN)) for row in self.rows)
+        self._ordenadas = None
+        self.visibles = self._calcular_visibles()
+        self.endResetModel()
+
+    def aplicar(self, filas: Iterable[tuple]):
+        # Brings the model in line with the full set of rows
+        filas = list(filas)
+        if filas == self.rows:
+            return
+        if not self.rows:
+            self.set_rows(filas)
+            return
+        claves = {fila[0] for fila in filas}
+        self.aplicar_cambios(filas, [clave for clave in self.posiciones if clave not in claves])
+
+    def aplicar_cambios(self, filas: Iterable[tuple], eliminadas: Iterable[Hashable]):
+        # Updates and appends leave existing indices valid, so the old layout can still be read
+        # when the change ends up needing a new one; removals wait until then
+        reordenar = False
+        repintar = False
+        for fila in filas:
+            clave = fila[0]
+            pos = self.posiciones.get(clave)
+            if pos is None:
+                self.posiciones[clave] = len(self.rows)
+                self.rows.append(fila)
+                self.indice.actualizar(clave, self.valor(fila, self.SEARCH_COLUMN))
+                reordenar = True
+                continue
+            anterior = self.rows[pos]
+            if anterior == fila:
+                continue
+            visible = self.acepta(anterior)
+            self.rows[pos] = fila
+            self.indice.actualizar(clave, self.valor(fila, self.SEARCH_COLUMN))
+            if visible != self.acepta(fila) or (
+                    self.orden is not None and self.valor(anterior, self.orden[0]) != self.valor(fila, self.orden[0])):
+                reordenar = True
+            repintar = repintar or visible
+
+        eliminadas = {clave for clave in eliminadas if clave in self.posiciones}
+        if reordenar or eliminadas:
+            self._ordenadas = None
+            self._relayout(lambda: self._quitar(eliminadas))
+            return
+        if repintar:
+            # The view only repaints the rows on screen, so one signal for all of them is cheapest
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.visibles) - 1, len(self.HEADERS) - 1))
+
+    def _quitar(self, claves):
+        if not claves:
+            return
+        # Only rows after the first removed one move
+        primera = min(self.posiciones[clave] for clave in claves)
+        for clave in claves:
+            self.indice.eliminar(clave)
+            del self.posiciones[clave]
+        cola = [row for row in self.rows[primera:] if row[0] not in claves]
+        del self.rows[primera:]
+        self.rows.extend(cola)
+        for i in range(primera, len(self.rows)):
+            self.posiciones[self.rows[i][0]] = i
+
+    def filtrar(self, texto: str, filtros: Dict[int, str]):
+        # One search and one layout change for the text box and combo filters together
+        filtros = dict(filtros)
+        if texto.lower() == self.indice.consulta and filtros == self.filtros:
+            return
+        self.filtros = filtros
+        self._relayout(lambda: self.indice.buscar(texto))
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if self.orden == (column, order):
+            return
+        self.orden = (column, order)
+        self._ordenadas = None
+        self._relayout(None)
+
+    def _orden_completo(self) -> List[int]:
+        if self._ordenadas is None:
+            if self.orden is None:
+                self._ordenadas = list(range(len(self.rows)))
+            else:
+                columna, orden = self.orden
+                if self.rows and columna >= len(self.rows[0]):
+                    # A column without data (actions) keeps the rows in their order
+                    self._ordenadas = list(range(len(self.rows)))
+                else:
+                    claves = list(map(itemgetter(columna), self.rows))
+                    self._ordenadas = sorted(range(len(claves)), key=claves.__getitem__,
+                                             reverse=orden == Qt.SortOrder.DescendingOrder)
+        return self._ordenadas
+
+    def _calcular_visibles(self) -> List[int]:
+        resultado = self.indice.resultado
+        if resultado is not None and len(resultado) < len(self.rows) * self.SELECTIVA:
+            # A narrow search: sort just the matches instead of walking every row
+            candidatos = sorted(self.posiciones[clave] for clave in resultado)
+            if self.orden is not None:
+                columna, orden = self.orden
+                candidatos.sort(key=lambda i: self.valor(self.rows[i], columna),
+                                reverse=orden == Qt.SortOrder.DescendingOrder)
+        elif resultado is not None:
+            rows = self.rows
+            candidatos = [i for i in self._orden_completo() if rows[i][0] in resultado]
+        else:
+            candidatos = list(self._orden_completo())
+        # One pass per filter, inlined: these loops run over every row on each keystroke
+        rows = self.rows
+        for col, valor in self.filtros.items():
+            buscado = (valor,)
+            candidatos = [i for i in candidatos if rows[i][col:col + 1] == buscado]
+        return candidatos
+
+    def _relayout(self, cambiar: Optional[Callable[[], None]]):
+        self.layoutAboutToBeChanged.emit()
+        # Selection and current index follow their rows by key
+        persistentes = self.persistentIndexList()
+        claves = [self.rows[self.visibles[index.row()]][0] for index in persistentes]
+        if cambiar is not None:
+            cambiar()
+        self.visibles = self._calcular_visibles()
+        if persistentes:
+            filas = self.filas_de(set(claves))
+            self.changePersistentIndexList(persistentes, [
+                self.index(filas[clave], index.column()) if clave in filas else QModelIndex()
+                for clave, index in zip(claves, persistentes)
+            ])
+        self.layoutChanged.emit()
+
+    def filas_de(self, claves) -> Dict[Hashable, int]:
+        # View rows of the given keys that are on display; a few keys (a selection, a scan)
+        # are looked up directly instead of mapping every visible row
+        if len(claves) > 32:
+            rows = self.rows
+            return {rows[i][0]: fila for fila, i in enumerate(self.visibles) if rows[i][0] in claves}
+        filas = {}
+        for clave in claves:
+            try:
+                filas[clave] = self.visibles.index(self.posiciones[clave])
+            except (KeyError, ValueError):
+                pass
+        return filas
+
+    def fila(self, view_row: int) -> tuple:
+        return self.rows[self.visibles[view_row]]
+
+    def filas_mostradas(self) -> List[tuple]:
+        return [self.rows[i] for i in self.visibles]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.visibles)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            row = self.fila(index.row())
+            return row[index.column()] if index.column() < len(row) else None
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
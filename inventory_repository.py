@@ -0,0 +1,228 @@
+from typing import Dict, List, Optional
+from PyQt6.QtCore import QObject, pyqtSignal
+from db_manager import DatabaseManager
+from query_executor import QueryExecutor
+
+class InventoryRepository(QObject):
+    # Machines are compact rows (attribute access), loans compact rows, supervisors dicts
+    maquinas_cambiadas = pyqtSignal(list)
+    maquinas_eliminadas = pyqtSignal(list)
+    prestamos_abiertos = pyqtSignal(list)
+    prestamos_cerrados = pyqtSignal(list)
+    supervisores_cambiados = pyqtSignal(list)
+    # Emitted when every part of a sincronizar() call has reported back
+    sincronizado = pyqtSignal()
+    # Emitted after a write went through; data the repository does not hold (dashboard aggregates) is now stale
+    modificado = pyqtSignal()
+    error = pyqtSignal(str)
+
+    PAGE_SIZE = 200
+
+    def __init__(self, db: DatabaseManager, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.executor = QueryExecutor(self)
+        self.maquinas: Dict[str, object] = {}
+        # Open loans by loan id, and by machine (a machine has at most one open loan)
+        self.prestamos: Dict[str, object] = {}
+        self.prestamos_por_maquina: Dict[str, object] = {}
+        self.supervisores: Optional[List[Dict]] = None
+        # Server timestamp of the last machine sync; None until the first full load has completed
+        self.marca = None
+        self.cargando = False
+        # Machine ids read by the full load in progress
+        self._cargadas = set()
+        self._pendientes = set()
+
+    @property
+    def completo(self) -> bool:
+        return self.marca is not None
+
+    def maquinas_disponibles(self) -> List:
+        return [m for m in self.maquinas.values() if m.estado == 'disponible']
+
+    def prestamo_activo(self, maquina_id: str):
+        # A loan opened since the last sync (or before the first one finished) is read directly
+        prestamo = self.prestamos_por_maquina.get(maquina_id)
+        if prestamo is None:
+            prestamo = self.db.obtener_prestamo_activo(maquina_id, compacto=True)
+        return prestamo
+
+    def sincronizar(self):
+        # One refresh for every tab: machines arrive as a delta once loaded, loans and
+        # supervisors are small enough to re-read and diff
+        if not self.cargando:
+            if self.marca is None:
+                self.cargando = True
+                self._cargadas = set()
+                self._enviar('maquinas', self.consultar_primera_pagina, self.aplicar_pagina)
+            else:
+                desde = self.marca
+                self._enviar('maquinas', lambda: self.db.obtener_maquinas_cambiadas(
+                    desde, incluir_supervisor=True, compacto=True), self.aplicar_cambios)
+        self._enviar('prestamos', lambda: self.db.obtener_prestamos_abiertos(compacto=True), self.aplicar_prestamos)
+        self._enviar('supervisores', self.consultar_supervisores, self.aplicar_supervisores)
+
+    def recargar_supervisores(self):
+        self._enviar('supervisores', self.consultar_supervisores, self.aplicar_supervisores)
+
+    def consultar_supervisores(self):
+        # A failed read must not look like an empty list: it would clear every supervisor name
+        return self.db.obtener_supervisores(estricto=True)
+
+    def _enviar(self, clave: str, consulta, al_terminar):
+        self._pendientes.add(clave)
+
+        def terminar(resultado):
+            # Discarded before the callback so a chained request (the next page) keeps the key pending
+            self._pendientes.discard(clave)
+            al_terminar(resultado)
+            self._terminar()
+
+        def fallar(mensaje):
+            self._pendientes.discard(clave)
+            if clave == 'maquinas':
+                self.cargando = False
+            self.error.emit(mensaje)
+            self._terminar()
+
+        self.executor.submit(clave, consulta, terminar, fallar)
+
+    def _terminar(self):
+        if not self._pendientes:
+            self.sincronizado.emit()
+
+    def consultar_primera_pagina(self):
+        # Runs on a worker thread. The sync mark is taken before reading so changes made
+        # while the pages load arrive with the next delta.
+        marca = self.db.obtener_marca_maquinas()
+        pagina = self.db.obtener_maquinas_pagina(limite=self.PAGE_SIZE, incluir_supervisor=True, compacto=True)
+        return marca, pagina
+
+    def aplicar_pagina(self, resultado):
+        # Pages are applied and announced as they arrive so the first one can be shown at once
+        marca, pagina = resultado
+        for maquina in pagina['filas']:
+            self.maquinas[maquina.id] = maquina
+            self._cargadas.add(maquina.id)
+        if pagina['filas']:
+            self.maquinas_cambiadas.emit(pagina['filas'])
+
+        cursor = pagina['cursor']
+        if cursor is None:
+            # Only a load whose every page was read is complete; a failed page goes to fallar and
+            # the next sincronizar() starts over
+            self.marca = marca
+            self.cargando = False
+            # Left over from an earlier attempt and deleted since
+            eliminadas = [maquina_id for maquina_id in self.maquinas if maquina_id not in self._cargadas]
+            for maquina_id in eliminadas:
+                del self.maquinas[maquina_id]
+            self._cargadas = set()
+            if eliminadas:
+                self.maquinas_eliminadas.emit(eliminadas)
+            return
+        self._enviar('maquinas', lambda: (marca, self.db.obtener_maquinas_pagina(
+            limite=self.PAGE_SIZE, cursor=cursor, incluir_supervisor=True, compacto=True)), self.aplicar_pagina)
+
+    def aplicar_cambios(self, cambios):
+        cambiadas = [m for m in cambios['cambiadas'] if self.maquinas.get(m.id) != m]
+        for maquina in cambiadas:
+            self.maquinas[maquina.id] = maquina
+        eliminadas = [maquina_id for maquina_id in cambios['eliminadas']
+                      if self.maquinas.pop(maquina_id, None) is not None]
+        self.marca = cambios['marca']
+        if cambiadas:
+            self.maquinas_cambiadas.emit(cambiadas)
+        if eliminadas:
+            self.maquinas_eliminadas.emit(eliminadas)
+
+    def aplicar_prestamos(self, filas):
+        actuales = {prestamo.id: prestamo for prestamo in filas}
+        abiertos = [prestamo for prestamo_id, prestamo in actuales.items() if prestamo_id not in self.prestamos]
+        cerrados = [prestamo_id for prestamo_id in self.prestamos if prestamo_id not in actuales]
+        self.prestamos = actuales
+        self.prestamos_por_maquina = {prestamo.maquina_id: prestamo for prestamo in filas}
+        if abiertos:
+            self.prestamos_abiertos.emit(abiertos)
+        if cerrados:
+            self.prestamos_cerrados.emit(cerrados)
+
+    def aplicar_supervisores(self, supervisores):
+        if supervisores != self.supervisores:
+            self.supervisores = supervisores
+            self.supervisores_cambiados.emit(supervisores)
+            self.renombrar_supervisores(supervisores)
+
+    def renombrar_supervisores(self, supervisores):
+        # Machine rows carry the joined supervisor name, but renaming a supervisor does not touch
+        # maquinas.fecha_actualizacion, so the delta would never resend them
+        nombres = {supervisor['id']: supervisor['nombre'] for supervisor in supervisores}
+        cambiadas = []
+        for maquina in self.maquinas.values():
+            if maquina.supervisor_id is None:
+                continue
+            nombre = nombres.get(maquina.supervisor_id)
+            if nombre != maquina.supervisor_nombre:
+                cambiadas.append(maquina._replace(supervisor_nombre=nombre))
+        for maquina in cambiadas:
+            self.maquinas[maquina.id] = maquina
+        if cambiadas:
+            self.maquinas_cambiadas.emit(cambiadas)
+
+    # Writes go to the database and are followed by one delta sync that updates every tab
+
+    def abrir_prestamos(self, prestamos: List[Dict]) -> bool:
+        resultado = self.db.crear_prestamos_lote(prestamos)
+        if resultado:
+            self.sincronizar()
+        return self._escrito(resultado)
+
+    def cerrar_prestamos(self, prestamo_ids: List[str]) -> bool:
+        resultado = self.db.finalizar_prestamos_lote(prestamo_ids)
+        if resultado:
+            self.sincronizar()
+        return self._escrito(resultado)
+
+    def crear_maquina(self, maquina_data: Dict) -> bool:
+        resultado = self.db.crear_maquina(maquina_data)
+        self.sincronizar()
+        return self._escrito(resultado)
+
+    def actualizar_maquina(self, id: str, nombre: str, categoria: str, estado: str, ubicacion: str,
+                           supervisor_id: str) -> bool:
+        resultado = self.db.actualizar_maquina(id, nombre, categoria, estado, ubicacion, supervisor_id)
+        self.sincronizar()
+        return self._escrito(resultado)
+
+    def asignar_supervisor_maquina(self, maquina_id: str, supervisor_id: str) -> bool:
+        resultado = self.db.asignar_supervisor_maquina(maquina_id, supervisor_id)
+        self.sincronizar()
+        return self._escrito(resultado)
+
+    def eliminar_maquina(self, maquina_id: str) -> bool:
+        resultado = self.db.eliminar_maquina(maquina_id)
+        self.sincronizar()
+        return self._escrito(resultado)
+
+    def insertar_supervisor(self, id: str, nombre: str, email: str, telefono: str, permiso: str,
+                            auth_provider: str = None) -> bool:
+        resultado = self.db.insertar_supervisor(id, nombre, email, telefono, permiso, auth_provider)
+        self.recargar_supervisores()
+        return self._escrito(resultado)
+
+    def actualizar_supervisor(self, id: str, nombre: str, email: str, telefono: str, permiso: str,
+                              auth_provider: str = None) -> bool:
+        resultado = self.db.actualizar_supervisor(id, nombre, email, telefono, permiso, auth_provider)
+        self.recargar_supervisores()
+        return self._escrito(resultado)
+
+    def eliminar_supervisor(self, supervisor_id: str) -> bool:
+        resultado = self.db.eliminar_supervisor(supervisor_id)
+        self.recargar_supervisores()
+        return self._escrito(resultado)
+
+    def _escrito(self, resultado: bool) -> bool:
+        if resultado:
+            self.modificado.emit()
+        return resultado
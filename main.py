@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (QMainWindow, QTabWidget, QApplication, QVBoxLayout, QWidget, QLabel,
     QStackedWidget, QFrame, QPushButton, QHBoxLayout, QSpacerItem, QSizePolicy)
 from PyQt6.QtGui import QIcon, QFont, QColor, QPainter, QLinearGradient
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QSize, QTimer
+from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QSize, QTimer, pyqtSignal
 from design_system import CLOUD_THEME, CLOUD_STYLE, APP_FONT
 from dashboard_cloud import DashboardCloud
 from maquinas_ui import MaquinasUI
@@ -9,9 +9,14 @@ from supervisores_ui import SupervisoresUI
 from prestamos_ui import PrestamosUI
 from devolucione_ui import DevolucionesUI
 from db_manager import DatabaseManager
+from inventory_repository import InventoryRepository
+from refresh_scheduler import RefreshScheduler
 import sys
 
 class EnterpriseNavButton(QPushButton):
+    hovered = pyqtSignal()
+    unhovered = pyqtSignal()
+
     def __init__(self, text, icon_path=None):
         super().__init__(text)
         if icon_path:
@@ -40,10 +45,23 @@ class EnterpriseNavButton(QPushButton):
             }}
         """)
 
+    def enterEvent(self, event):
+        super().enterEvent(event)
+        self.hovered.emit()
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        self.unhovered.emit()
+
 class MainWindow(QMainWindow):
+    # Hovering a nav button this long builds its tab before it is clicked
+    PREFETCH_DELAY_MS = 200
+
     def __init__(self):
         super().__init__()
         self.db = DatabaseManager()
+        # One copy of machines, open loans and supervisors shared by every tab
+        self.repo = InventoryRepository(self.db, parent=self)
         self.init_ui()
         self.setup_animations()
 
@@ -97,14 +115,14 @@ class MainWindow(QMainWindow):
         # Navigation buttons
         self.nav_buttons = []
         nav_items = [
-            ('Dashboard', '📊', DashboardCloud),
-            ('Devices', '💻', MaquinasUI),
-            ('Supervisors', '👥', SupervisoresUI),
-            ('Loans', '📋', PrestamosUI),
-            ('Returns', '↩️', DevolucionesUI)
+            ('Dashboard', '📊', DashboardCloud, 'loadData'),
+            ('Devices', '💻', MaquinasUI, 'cargar_datos'),
+            ('Supervisors', '👥', SupervisoresUI, 'cargar_datos'),
+            ('Loans', '📋', PrestamosUI, 'cargar_datos'),
+            ('Returns', '↩️', DevolucionesUI, 'cargar_datos')
         ]
 
-        for text, icon, _ in nav_items:
+        for text, icon, _, _ in nav_items:
             btn = EnterpriseNavButton(f'{icon} {text}')
             self.nav_buttons.append(btn)
             sidebar_layout.addWidget(btn)
@@ -124,11 +142,15 @@ class MainWindow(QMainWindow):
 
         status_label = QLabel('System Status')
         status_label.setStyleSheet(f'color: {CLOUD_THEME["colors"]["text"]["primary"]};')
-        status_value = QLabel('🟢 Operational')
-        status_value.setStyleSheet(f'color: {CLOUD_THEME["colors"]["success"]};')
+        self.status_value = QLabel('🟢 Operational')
+        self.status_value.setStyleSheet(f'color: {CLOUD_THEME["colors"]["success"]};')
+        self.db_metrics_label = QLabel('DB: no queries yet')
+        self.db_metrics_label.setStyleSheet(f'color: {CLOUD_THEME["colors"]["text"]["secondary"]}; font-size: 12px;')
+        self.db_metrics_label.setWordWrap(True)
 
         status_layout.addWidget(status_label)
-        status_layout.addWidget(status_value)
+        status_layout.addWidget(self.status_value)
+        status_layout.addWidget(self.db_metrics_label)
 
         sidebar_layout.addWidget(status_frame)
 
@@ -139,11 +161,26 @@ class MainWindow(QMainWindow):
         content_layout.setContentsMargins(24, 24, 24, 24)
 
         # Stacked widget for content
+        # Tabs are built on first use; until then the stack holds an empty placeholder
         self.stack = QStackedWidget()
-        for i, (_, _, widget_class) in enumerate(nav_items):
-            widget = widget_class(self.db)
-            self.stack.addWidget(widget)
-            self.nav_buttons[i].clicked.connect(lambda checked, idx=i: self.stack.setCurrentIndex(idx))
+        self.tab_classes = [widget_class for _, _, widget_class, _ in nav_items]
+        self.tab_refresh = [refresh for _, _, _, refresh in nav_items]
+        self.tabs = {}
+        # One timer for the whole window: only the visible tab reloads, hidden ones go stale
+        # Periodic reloads pause while the circuit breaker reports the database as unreachable
+        self.refresh_scheduler = RefreshScheduler(self.stack, available=lambda: not self.db.breaker.is_open, parent=self)
+        self.repo.modificado.connect(self.refresh_scheduler.request_refresh)
+        for i in range(len(nav_items)):
+            self.stack.addWidget(QWidget())
+            self.nav_buttons[i].clicked.connect(lambda checked, idx=i: self.show_tab(idx))
+            self.nav_buttons[i].hovered.connect(lambda idx=i: self.schedule_prefetch(idx))
+            self.nav_buttons[i].unhovered.connect(self.cancel_prefetch)
+
+        self.prefetch_index = None
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(self.PREFETCH_DELAY_MS)
+        self.prefetch_timer.timeout.connect(self.prefetch_tab)
 
         content_layout.addWidget(self.stack)
 
@@ -155,6 +192,69 @@ class MainWindow(QMainWindow):
         
         # Set initial active tab
         self.nav_buttons[0].setChecked(True)
+        self.show_tab(0)
+
+        # Live database latency in the System Status panel
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_system_status)
+        self.status_timer.start(2000)
+
+    def update_system_status(self):
+        metrics = self.db.obtener_metricas_consultas()
+        if self.db.breaker.is_open:
+            text, color = '🔴 Database unavailable', CLOUD_THEME['colors']['error']
+        elif metrics['ventana_errores']:
+            text, color = '🔴 Database errors', CLOUD_THEME['colors']['error']
+        elif metrics['ventana_max_ms'] >= self.db.stats.slow_threshold_ms:
+            text, color = '🟡 Slow queries', CLOUD_THEME['colors']['warning']
+        else:
+            text, color = '🟢 Operational', CLOUD_THEME['colors']['success']
+        self.status_value.setText(text)
+        self.status_value.setStyleSheet(f'color: {color};')
+
+        self.db_metrics_label.setText(
+            f"DB: {metrics['ventana_promedio_ms']:.0f} ms avg, {metrics['ventana_max_ms']:.0f} ms max\n"
+            f"{metrics['ventana_consultas']} queries/min, {metrics['lentas']} slow total"
+        )
+        hottest = sorted(metrics['por_metodo'].items(), key=lambda item: item[1]['total_ms'], reverse=True)[:5]
+        self.db_metrics_label.setToolTip("\n".join(
+            f"{name}: {stats['consultas']} calls, {stats['total_ms'] / stats['consultas']:.0f} ms avg, {stats['filas']} rows"
+            for name, stats in hottest
+        ))
+
+    def ensure_tab(self, index):
+        widget = self.tabs.get(index)
+        if widget is None:
+            # Constructing the tab starts its initial cargar_datos on the query executor
+            widget = self.tab_classes[index](self.repo)
+            placeholder = self.stack.widget(index)
+            self.stack.insertWidget(index, widget)
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.tabs[index] = widget
+            self.refresh_scheduler.register(widget, getattr(widget, self.tab_refresh[index]))
+        return widget
+
+    def show_tab(self, index):
+        self.cancel_prefetch()
+        self.stack.setCurrentWidget(self.ensure_tab(index))
+
+    def schedule_prefetch(self, index):
+        if index in self.tabs:
+            return
+        self.prefetch_index = index
+        self.prefetch_timer.start()
+
+    def cancel_prefetch(self):
+        self.prefetch_timer.stop()
+        self.prefetch_index = None
+
+    def prefetch_tab(self):
+        if self.prefetch_index is not None:
+            current = self.stack.currentIndex()
+            self.ensure_tab(self.prefetch_index)
+            self.stack.setCurrentIndex(current)
+            self.prefetch_index = None
 
     def setup_animations(self):
         self.stack.setStyleSheet('QStackedWidget { transition: all 0.3s ease-in-out; }')
@@ -1,8 +1,10 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QMessageBox, QDialog, QLabel, QProgressBar, QLineEdit, QComboBox, QFrame, QScrollArea)
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView, QAbstractItemView, QPushButton, QHeaderView, QMessageBox, QDialog, QLabel, QProgressBar, QLineEdit, QComboBox, QFrame, QScrollArea)
 from PyQt6.QtCore import Qt, QTimer, QSize
 from PyQt6.QtGui import QColor, QIcon, QFont
 from design_system import CLOUD_THEME
-from db_manager import DatabaseManager
+from inventory_repository import InventoryRepository
+from query_executor import QueryExecutor
+from filtered_table_model import FilteredTableModel, busqueda_diferida
 from nuevo_dispositivo_dialog import NuevoDispositivoDialog
 from editar_dispositivo_dialog import EditarDispositivoDialog
 import qrcode
@@ -10,19 +12,63 @@ from datetime import datetime
 import csv
 import os
 
+def fila_maquina(maquina) -> tuple:
+    # maquina is a compact row (db reads with compacto=True)
+    supervisor_nombre = maquina.supervisor_nombre
+    supervisor_text = f"{supervisor_nombre} ({maquina.supervisor_id})" if supervisor_nombre else 'Unassigned'
+    return (
+        maquina.id,
+        maquina.nombre or '',
+        maquina.categoria or '',
+        maquina.estado or '',
+        maquina.ubicacion or 'N/A',
+        supervisor_text,
+        maquina.fecha_actualizacion.strftime('%Y-%m-%d %H:%M') if maquina.fecha_actualizacion else 'N/A'
+    )
+
+class MaquinasTableModel(FilteredTableModel):
+    # One tuple per machine (see fila_maquina), searched by device name
+    HEADERS = ['ID', 'Name', 'Category', 'Status', 'Location', 'Supervisor', 'Last Updated']
+    CATEGORY_COLUMN = 2
+    STATUS_COLUMN = 3
+    STATUS_VALUES = {'Available': 'disponible', 'In Use': 'en_uso', 'Maintenance': 'mantenimiento'}
+    STATUS_COLORS = {
+        'Available': QColor(CLOUD_THEME['colors']['success']),
+        'disponible': QColor(CLOUD_THEME['colors']['success']),
+        'In Use': QColor(CLOUD_THEME['colors']['error']),
+        'en_uso': QColor(CLOUD_THEME['colors']['error']),
+        'Maintenance': QColor(CLOUD_THEME['colors']['warning']),
+        'mantenimiento': QColor(CLOUD_THEME['colors']['warning'])
+    }
+    DEFAULT_STATUS_COLOR = QColor(CLOUD_THEME['colors']['surface'])
+
+    def set_filters(self, search_text, category, status):
+        filtros = {}
+        if category != 'All Categories':
+            filtros[self.CATEGORY_COLUMN] = category
+        if status != 'All Status':
+            filtros[self.STATUS_COLUMN] = self.STATUS_VALUES.get(status, status)
+        self.filtrar(search_text, filtros)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role == Qt.ItemDataRole.BackgroundRole and index.column() == self.STATUS_COLUMN:
+            return self.STATUS_COLORS.get(self.fila(index.row())[self.STATUS_COLUMN], self.DEFAULT_STATUS_COLOR)
+        return super().data(index, role)
+
 class MaquinasUI(QWidget):
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, repo: InventoryRepository):
         super().__init__()
-        self.db = db
+        self.repo = repo
+        self.executor = QueryExecutor(self)
         self.init_ui()
-        self.setup_auto_refresh()
+        # Rows the repository already holds are shown at once; later pages and deltas arrive as signals
+        self.modelo.set_rows([fila_maquina(m) for m in repo.maquinas.values()])
+        repo.maquinas_cambiadas.connect(self.maquinas_cambiadas)
+        repo.maquinas_eliminadas.connect(self.maquinas_eliminadas)
+        repo.sincronizado.connect(self.mostrar_datos)
+        repo.error.connect(self.error_carga)
         self.cargar_datos()
 
-    def setup_auto_refresh(self):
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.cargar_datos)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
-
     def init_ui(self):
         main_layout = QVBoxLayout()
         main_layout.setSpacing(20)
@@ -38,7 +84,7 @@ class MaquinasUI(QWidget):
         search_layout = QHBoxLayout(search_box)
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search devices...")
-        self.search_input.textChanged.connect(self.filter_devices)
+        self.search_timer = busqueda_diferida(self.search_input, self.filter_devices)
         self.search_input.setStyleSheet(f"""
             QLineEdit {{
                 background: {CLOUD_THEME['colors']['card']};
@@ -100,12 +146,18 @@ class MaquinasUI(QWidget):
         header_layout.addWidget(actions)
 
         # Table
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(7)
-        self.tabla.setHorizontalHeaderLabels(['ID', 'Name', 'Category', 'Status', 'Location', 'Last Updated', 'Actions'])
+        self.modelo = MaquinasTableModel(self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.setSortingEnabled(True)
+        self.tabla.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        # Fixed row heights let the view skip measuring rows it never shows
+        self.tabla.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.tabla.setStyleSheet(f"""
-            QTableWidget {{
+            QTableView {{
                 background: {CLOUD_THEME['colors']['card']};
                 border: none;
                 border-radius: 10px;
@@ -157,11 +209,17 @@ class MaquinasUI(QWidget):
         main_layout.addWidget(status_bar)
         self.setLayout(main_layout)
 
+    def fila_seleccionada(self):
+        index = self.tabla.currentIndex()
+        if not index.isValid():
+            return None
+        return self.modelo.fila(index.row())
+
     def generate_qr_code(self):
-        selected_row = self.tabla.currentRow()
-        if selected_row >= 0:
-            device_id = self.tabla.item(selected_row, 0).text()
-            device_name = self.tabla.item(selected_row, 1).text()
+        fila = self.fila_seleccionada()
+        if fila:
+            device_id = fila[0]
+            device_name = fila[1]
             
             qr = qrcode.QRCode(version=1, box_size=10, border=5)
             qr.add_data(device_id)
@@ -180,57 +238,29 @@ class MaquinasUI(QWidget):
             self.mostrar_error("Selection Required", "Please select a device to generate QR code")
 
     def cargar_datos(self):
-        try:
-            self.status_label.setText('Loading data...')
-            self.progress_bar.setRange(0, 0)
-            self.progress_bar.show()
-            
-            maquinas = self.db.obtener_maquinas()
-            self.tabla.setRowCount(0)
-            
-            if not maquinas:
-                self.mostrar_estado_vacio("No devices registered")
-                return
-
-            self.tabla.setRowCount(len(maquinas))
-            for i, maquina in enumerate(maquinas):
-                self.tabla.setItem(i, 0, QTableWidgetItem(maquina['id']))
-                self.tabla.setItem(i, 1, QTableWidgetItem(maquina['nombre']))
-                self.tabla.setItem(i, 2, QTableWidgetItem(maquina['categoria']))
-                
-                # Enhanced status cell with color coding
-                status_item = QTableWidgetItem(maquina['estado'])
-                status_colors = {
-                    'Available': QColor(CLOUD_THEME['colors']['success']),
-                    'In Use': QColor(CLOUD_THEME['colors']['error']),
-                    'Maintenance': QColor(CLOUD_THEME['colors']['warning'])
-                }
-                status_item.setBackground(status_colors.get(maquina['estado'], QColor(CLOUD_THEME['colors']['surface'])))
-                self.tabla.setItem(i, 3, status_item)
-                
-                # Location
-                self.tabla.setItem(i, 4, QTableWidgetItem(maquina.get('ubicacion', 'N/A')))
-                
-                # Enhanced supervisor info
-                supervisor = self.db.obtener_supervisor_por_id(maquina['supervisor_id'])
-                supervisor_text = f"{supervisor['nombre']} ({maquina['supervisor_id']})" if supervisor else 'Unassigned'
-                self.tabla.setItem(i, 5, QTableWidgetItem(supervisor_text))
-                
-                # Last updated timestamp
-                self.tabla.setItem(i, 6, QTableWidgetItem(maquina.get('ultima_actualizacion', 'N/A')))
-            
-            self.status_label.setText(f'Data updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-            
-        except Exception as e:
-            self.mostrar_error("Loading Error", f"Could not load devices: {str(e)}")
-        finally:
-            self.progress_bar.hide()
+        self.status_label.setText('Loading data...')
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.repo.sincronizar()
 
-    def mostrar_estado_vacio(self, mensaje):
-        self.tabla.setRowCount(1)
-        self.tabla.setItem(0, 0, QTableWidgetItem(mensaje))
-        self.tabla.item(0, 0).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.tabla.setSpan(0, 0, 1, 6)
+    def maquinas_cambiadas(self, maquinas):
+        self.modelo.aplicar_cambios([fila_maquina(m) for m in maquinas], [])
+
+    def maquinas_eliminadas(self, maquina_ids):
+        self.modelo.aplicar_cambios([], maquina_ids)
+
+    def mostrar_datos(self):
+        self.progress_bar.hide()
+        if not self.modelo.rows:
+            self.status_label.setText("No devices registered")
+            return
+        self.status_label.setText(f'Data updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+
+    def error_carga(self, mensaje):
+        self.progress_bar.hide()
+        # Every tab hears the shared repository's errors; only the visible one reports them
+        if self.isVisible():
+            self.mostrar_error("Loading Error", f"Could not load devices: {mensaje}")
 
     def mostrar_error(self, titulo, mensaje):
         msg = QMessageBox(self)
@@ -241,67 +271,59 @@ class MaquinasUI(QWidget):
         msg.exec()
 
     def filter_devices(self):
-        search_text = self.search_input.text().lower()
-        category = self.category_filter.currentText()
-        status = self.status_filter.currentText()
-        
-        for row in range(self.tabla.rowCount()):
-            device_name = self.tabla.item(row, 1).text().lower()
-            device_category = self.tabla.item(row, 2).text()
-            device_status = self.tabla.item(row, 3).text()
-            
-            name_match = search_text in device_name
-            category_match = category == 'All Categories' or category == device_category
-            status_match = status == 'All Status' or status == device_status
-            
-            self.tabla.setRowHidden(row, not (name_match and category_match and status_match))
+        self.modelo.set_filters(
+            self.search_input.text(),
+            self.category_filter.currentText(),
+            self.status_filter.currentText()
+        )
 
     def export_inventory(self):
-        try:
-            self.status_label.setText('Exporting inventory data...')
-            self.progress_bar.setRange(0, 100)
-            self.progress_bar.setValue(0)
-            self.progress_bar.show()
-            
-            # Get all visible rows
-            data = []
-            headers = ['ID', 'Name', 'Category', 'Status', 'Location', 'Supervisor', 'Last Updated']
-            data.append(headers)
-            
-            for row in range(self.tabla.rowCount()):
-                if not self.tabla.isRowHidden(row):
-                    row_data = []
-                    for col in range(self.tabla.columnCount()):
-                        item = self.tabla.item(row, col)
-                        row_data.append(item.text() if item else '')
-                    data.append(row_data)
-            
-            filename = f'inventory_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-            
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerows(data)
-            
-            self.status_label.setText(f'Export completed: {filename}')
-            self.progress_bar.setValue(100)
-            
-            msg = QMessageBox(self)
-            msg.setIcon(QMessageBox.Icon.Information)
-            msg.setWindowTitle('Export Successful')
-            msg.setText(f'Inventory data has been exported to:\n{filename}')
-            msg.setStyleSheet(f"background-color: {CLOUD_THEME['colors']['surface']}; color: {CLOUD_THEME['colors']['text']['primary']};")
-            msg.exec()
-            
-        except Exception as e:
-            self.mostrar_error('Export Error', f'Could not export inventory data: {str(e)}')
-        finally:
-            self.progress_bar.hide()
+        filename = f'inventory_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        self.status_label.setText('Exporting inventory data...')
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        # The visible rows and the filters are captured here; the file is written on a worker thread
+        filas = self.modelo.filas_mostradas() if self.repo.completo else None
+        acepta = self.modelo.filtro_externo()
+        self.executor.submit('export', lambda: self.escribir_exportacion(filename, filas, acepta),
+                             self.exportacion_terminada, self.error_exportacion)
+
+    def escribir_exportacion(self, filename, filas, acepta):
+        if filas is None:
+            # The repository is still loading pages: stream the table and apply the same filters
+            maquinas = self.repo.db.iterar_maquinas(incluir_supervisor=True, compacto=True)
+            filas = (fila for fila in map(fila_maquina, maquinas) if acepta(fila))
+        total = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(MaquinasTableModel.HEADERS)
+            for fila in filas:
+                writer.writerow(fila)
+                total += 1
+        return filename, total
+
+    def exportacion_terminada(self, resultado):
+        filename, total = resultado
+        self.progress_bar.hide()
+        self.status_label.setText(f'Export completed: {filename} ({total} devices)')
+
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Information)
+        msg.setWindowTitle('Export Successful')
+        msg.setText(f'Inventory data has been exported to:\n{filename}')
+        msg.setStyleSheet(f"background-color: {CLOUD_THEME['colors']['surface']}; color: {CLOUD_THEME['colors']['text']['primary']};")
+        msg.exec()
+
+    def error_exportacion(self, mensaje):
+        self.progress_bar.hide()
+        self.status_label.setText('System Ready')
+        self.mostrar_error('Export Error', f'Could not export inventory data: {mensaje}')
 
     def abrir_dialogo_nuevo(self):
-        dialog = NuevoDispositivoDialog(self.db)
+        dialog = NuevoDispositivoDialog(self.repo.db)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
-            self.db.crear_maquina({
+            self.repo.crear_maquina({
                 'id': data['id'],
                 'nombre': data['nombre'],
                 'categoria': data['categoria'],
@@ -309,16 +331,15 @@ class MaquinasUI(QWidget):
                 'ubicacion': data['ubicacion'],
                 'supervisor_id': data['supervisor_id']
             })
-            self.cargar_datos()
 
     def abrir_dialogo_editar(self):
-        selected_row = self.tabla.currentRow()
-        if selected_row >= 0:
-            maquina_id = self.tabla.item(selected_row, 0).text()
-            dialog = EditarDispositivoDialog(self.db, maquina_id)
+        fila = self.fila_seleccionada()
+        if fila:
+            maquina_id = fila[0]
+            dialog = EditarDispositivoDialog(self.repo.db, maquina_id)
             if dialog.exec() == QDialog.DialogCode.Accepted:
                 data = dialog.get_data()
-                self.db.actualizar_maquina(
+                self.repo.actualizar_maquina(
                     data['id'],
                     data['nombre'],
                     data['categoria'],
@@ -326,14 +347,13 @@ class MaquinasUI(QWidget):
                     data['ubicacion'],
                     data['supervisor_id']
                 )
-                self.cargar_datos()
         else:
             self.mostrar_error("Selección requerida", "Por favor, seleccione un dispositivo para editar")
 
     def eliminar_dispositivo(self):
-        selected_row = self.tabla.currentRow()
-        if selected_row >= 0:
-            maquina_id = self.tabla.item(selected_row, 0).text()
+        fila = self.fila_seleccionada()
+        if fila:
+            maquina_id = fila[0]
             confirm = QMessageBox()
             confirm.setIcon(QMessageBox.Icon.Question)
             confirm.setWindowTitle("Confirmar eliminación")
@@ -343,8 +363,8 @@ class MaquinasUI(QWidget):
             
             if confirm.exec() == QMessageBox.StandardButton.Yes:
                 try:
-                    self.db.eliminar_maquina(maquina_id)
-                    self.cargar_datos()
+                    if not self.repo.eliminar_maquina(maquina_id):
+                        self.mostrar_error("Error de eliminación", "No se pudo eliminar el dispositivo")
                 except Exception as e:
                     self.mostrar_error("Error de eliminación", f"No se pudo eliminar el dispositivo: {str(e)}")
         else:
@@ -0,0 +1,270 @@
+import hashlib
+from typing import Dict, List, Optional
+from mysql.connector import Error, errorcode
+
+# Applied in order and recorded in version_schema. Never edit a migration once it has shipped:
+# its checksum is stored, so schema changes always go in a new entry at the end of the list.
+# database_schema.sql describes the resulting schema and must be kept in sync.
+MIGRATIONS = [
+    {
+        'version': '001',
+        'description': 'Base schema',
+        'statements': [
+            """
+            CREATE TABLE IF NOT EXISTS supervisores (
+                id VARCHAR(36) PRIMARY KEY,
+                nombre VARCHAR(255) NOT NULL,
+                email VARCHAR(255) UNIQUE NOT NULL,
+                telefono VARCHAR(20),
+                permiso ENUM('basico', 'avanzado', 'admin') NOT NULL DEFAULT 'basico',
+                fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
+                ultimo_acceso DATETIME,
+                INDEX idx_permiso (permiso)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS maquinas (
+                id VARCHAR(36) PRIMARY KEY,
+                nombre VARCHAR(255) NOT NULL,
+                categoria VARCHAR(100),
+                estado ENUM('disponible', 'en_uso', 'mantenimiento') NOT NULL DEFAULT 'disponible',
+                ultimo_mantenimiento DATE,
+                codigo_qr VARCHAR(255),
+                supervisor_id VARCHAR(36),
+                ubicacion VARCHAR(100),
+                especificaciones JSON,
+                fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+                fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_estado (estado),
+                INDEX idx_categoria (categoria),
+                INDEX idx_ubicacion (ubicacion),
+                INDEX idx_fecha_actualizacion (fecha_actualizacion)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS prestamos (
+                id VARCHAR(36) PRIMARY KEY,
+                maquina_id VARCHAR(36) NOT NULL,
+                supervisor_id VARCHAR(36) NOT NULL,
+                fecha_prestamo DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                fecha_devolucion DATETIME,
+                observaciones TEXT,
+                estado ENUM('activo', 'completado', 'vencido') NOT NULL DEFAULT 'activo',
+                codigo_prestamo VARCHAR(128) UNIQUE,
+                FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
+                FOREIGN KEY (supervisor_id) REFERENCES supervisores(id),
+                INDEX idx_estado_prestamo (estado),
+                INDEX idx_fechas (fecha_prestamo, fecha_devolucion)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS proveedores (
+                id VARCHAR(36) PRIMARY KEY,
+                nombre VARCHAR(255) NOT NULL,
+                contacto VARCHAR(255),
+                telefono VARCHAR(20),
+                email VARCHAR(255) UNIQUE
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS mantenimientos (
+                id VARCHAR(36) PRIMARY KEY,
+                maquina_id VARCHAR(36) NOT NULL,
+                supervisor_id VARCHAR(36) NOT NULL,
+                severidad ENUM('critica', 'alta', 'media', 'baja') NOT NULL,
+                descripcion_problema TEXT NOT NULL,
+                detalles_resolucion TEXT,
+                estado ENUM('reportado', 'en_progreso', 'resuelto') NOT NULL DEFAULT 'reportado',
+                fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+                fecha_resolucion DATETIME,
+                costo DECIMAL(10,2),
+                FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
+                FOREIGN KEY (supervisor_id) REFERENCES supervisores(id),
+                INDEX idx_estado_mant (estado)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS alertas (
+                id VARCHAR(36) PRIMARY KEY,
+                maquina_id VARCHAR(36) NOT NULL,
+                tipo VARCHAR(50) NOT NULL,
+                descripcion TEXT,
+                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                resuelta BOOLEAN DEFAULT FALSE,
+                FOREIGN KEY (maquina_id) REFERENCES maquinas(id)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS auditoria (
+                id VARCHAR(36) PRIMARY KEY,
+                tabla_afectada VARCHAR(100) NOT NULL,
+                accion VARCHAR(50) NOT NULL,
+                usuario_id VARCHAR(36) NOT NULL,
+                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                datos_anteriores TEXT,
+                datos_nuevos TEXT,
+                INDEX idx_auditoria_fecha (fecha),
+                INDEX idx_auditoria_usuario (usuario_id)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS historial_movimientos (
+                id VARCHAR(36) PRIMARY KEY,
+                maquina_id VARCHAR(36) NOT NULL,
+                ubicacion_anterior VARCHAR(100),
+                ubicacion_nueva VARCHAR(100) NOT NULL,
+                fecha TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                supervisor_id VARCHAR(36) NOT NULL,
+                FOREIGN KEY (maquina_id) REFERENCES maquinas(id),
+                FOREIGN KEY (supervisor_id) REFERENCES supervisores(id),
+                INDEX idx_movimientos_fecha (fecha)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS ubicaciones (
+                id VARCHAR(36) PRIMARY KEY,
+                nombre VARCHAR(255) NOT NULL,
+                zona ENUM('norte', 'sur', 'este', 'oeste', 'central') NOT NULL,
+                descripcion TEXT,
+                capacidad INT,
+                INDEX idx_zona (zona)
+            ) ENGINE=InnoDB
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS usuarios (
+                id VARCHAR(36) PRIMARY KEY,
+                username VARCHAR(255) UNIQUE NOT NULL,
+                password_hash VARCHAR(255) NOT NULL,
+                rol VARCHAR(50) NOT NULL,
+                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_username (username)
+            ) ENGINE=InnoDB
+            """
+        ]
+    },
+    {
+        # Databases created by the old inline DDL in DatabaseManager are missing these
+        # columns and indexes; on a fresh database every statement is a no-op
+        'version': '002',
+        'description': 'Bring legacy tables up to the declared schema',
+        'statements': [
+            "ALTER TABLE maquinas ADD COLUMN ubicacion VARCHAR(100)",
+            "ALTER TABLE maquinas ADD COLUMN especificaciones JSON",
+            "ALTER TABLE maquinas ADD COLUMN fecha_creacion DATETIME DEFAULT CURRENT_TIMESTAMP",
+            "ALTER TABLE maquinas ADD COLUMN fecha_actualizacion DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+            "ALTER TABLE maquinas ADD INDEX idx_estado (estado)",
+            "ALTER TABLE maquinas ADD INDEX idx_categoria (categoria)",
+            "ALTER TABLE maquinas ADD INDEX idx_ubicacion (ubicacion)",
+            "ALTER TABLE maquinas ADD INDEX idx_fecha_actualizacion (fecha_actualizacion)",
+            "ALTER TABLE supervisores ADD COLUMN ultimo_acceso DATETIME",
+            "ALTER TABLE supervisores ADD INDEX idx_permiso (permiso)",
+            "ALTER TABLE prestamos ADD COLUMN estado ENUM('activo', 'completado', 'vencido') NOT NULL DEFAULT 'activo'",
+            "ALTER TABLE prestamos ADD COLUMN codigo_prestamo VARCHAR(128) UNIQUE",
+            "ALTER TABLE prestamos ADD INDEX idx_estado_prestamo (estado)",
+            "ALTER TABLE prestamos ADD INDEX idx_fechas (fecha_prestamo, fecha_devolucion)",
+            "ALTER TABLE auditoria ADD INDEX idx_auditoria_fecha (fecha)",
+            "ALTER TABLE auditoria ADD INDEX idx_auditoria_usuario (usuario_id)",
+            "ALTER TABLE historial_movimientos ADD INDEX idx_movimientos_fecha (fecha)",
+            "ALTER TABLE usuarios ADD INDEX idx_username (username)"
+        ]
+    },
+    {
+        # Open-loan lookups by machine: equality on maquina_id, IS NULL on fecha_devolucion
+        'version': '003',
+        'description': 'Index active loans by machine',
+        'statements': [
+            "ALTER TABLE prestamos ADD INDEX idx_prestamo_activo (maquina_id, fecha_devolucion)"
+        ]
+    },
+    {
+        # Keyset pages of loans walk (fecha_prestamo, id); InnoDB appends the primary key to the index
+        'version': '004',
+        'description': 'Index loans by date for paging',
+        'statements': [
+            "ALTER TABLE prestamos ADD INDEX idx_fecha_prestamo (fecha_prestamo)"
+        ]
+    },
+    {
+        # Loans open since a date: IS NULL OR >= are two ranges of this index; idx_fechas leads
+        # on fecha_prestamo and cannot serve them
+        'version': '005',
+        'description': 'Index loans by return date',
+        'statements': [
+            "ALTER TABLE prestamos ADD INDEX idx_fecha_devolucion (fecha_devolucion)"
+        ]
+    }
+]
+
+VERSION_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS version_schema (
+        version VARCHAR(32) PRIMARY KEY,
+        fecha_aplicacion DATETIME DEFAULT CURRENT_TIMESTAMP,
+        checksum VARCHAR(64) NOT NULL
+    ) ENGINE=InnoDB
+"""
+
+# Re-running a partially applied migration must not fail on the parts that already went through
+IGNORABLE_ERRORS = {
+    errorcode.ER_TABLE_EXISTS_ERROR,
+    errorcode.ER_DUP_FIELDNAME,
+    errorcode.ER_DUP_KEYNAME
+}
+
+def migration_checksum(migration: Dict) -> str:
+    normalized = "\n".join(" ".join(statement.split()) for statement in migration['statements'])
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+class MigrationRunner:
+    def __init__(self, connection, migrations: List[Dict] = None):
+        self.connection = connection
+        self.migrations = MIGRATIONS if migrations is None else migrations
+
+    def applied_versions(self) -> Optional[Dict[str, str]]:
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT version, checksum FROM version_schema")
+                return {version: checksum for version, checksum in cursor.fetchall()}
+        except Error as e:
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                return None
+            raise
+
+    def pending(self, applied: Dict[str, str]) -> List[Dict]:
+        pending = []
+        for migration in self.migrations:
+            checksum = migration_checksum(migration)
+            stored = applied.get(migration['version'])
+            if stored is None:
+                pending.append(migration)
+            elif stored != checksum:
+                print(f"[WARNING] Migration {migration['version']} was modified after being applied (checksum mismatch).")
+        return pending
+
+    def run(self) -> List[str]:
+        # Warm start: a single SELECT on version_schema and no DDL at all
+        applied = self.applied_versions()
+        if applied is None:
+            with self.connection.cursor() as cursor:
+                cursor.execute(VERSION_TABLE_DDL)
+            applied = {}
+
+        done = []
+        for migration in self.pending(applied):
+            self._apply(migration)
+            done.append(migration['version'])
+        return done
+
+    def _apply(self, migration: Dict):
+        with self.connection.cursor() as cursor:
+            for statement in migration['statements']:
+                try:
+                    cursor.execute(statement)
+                except Error as e:
+                    if e.errno not in IGNORABLE_ERRORS:
+                        raise
+            cursor.execute(
+                "INSERT INTO version_schema (version, checksum) VALUES (%s, %s)",
+                (migration['version'], migration_checksum(migration))
+            )
+        self.connection.commit()
+        print(f"[INFO] Applied migration {migration['version']}: {migration['description']}")
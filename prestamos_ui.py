@@ -1,9 +1,9 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QMessageBox, QComboBox, QLineEdit, QLabel, QInputDialog, QDialog, QProgressBar, QFrame, QApplication)
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QPushButton, QHeaderView, QMessageBox, QComboBox, QLineEdit, QLabel, QDialog, QProgressBar, QFrame)
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
-from PyQt6.QtGui import QColor, QLinearGradient, QBrush, QImage, QPixmap, QIcon
-from db_manager import DatabaseManager
-import cv2
-from pyzbar.pyzbar import decode
+from PyQt6.QtGui import QColor, QLinearGradient, QBrush, QIcon
+from inventory_repository import InventoryRepository
+from escaner_dialog import EscanerDialog
+from table_sync import TableSync, sincronizar_combo
 from datetime import datetime
 import uuid
 
@@ -50,7 +50,7 @@ class EnterpriseTableWidget(QTableWidget):
         """)
         self.verticalHeader().hide()
         self.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
         self.setAlternatingRowColors(True)
 
 class CloudButton(QPushButton):
@@ -76,19 +76,31 @@ class CloudButton(QPushButton):
         """)
 
 class PrestamosUI(QWidget):
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, repo: InventoryRepository):
         super().__init__()
         self.setStyleSheet(CLOUD_STYLE)
         self.setFont(APP_FONT)
-        self.db = db
+        self.repo = repo
+        self.indice_disponibles = {}
         self.init_ui()
-        self.cargar_datos()
-        self.setup_auto_refresh()
+        self.sync_disponibles = TableSync(self.tabla_disponibles)
+        self.sync_asignadas = TableSync(self.tabla_asignadas)
+
+        # Initial pages and bursts of deltas collapse into one redraw of the tables
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(50)
+        self.render_timer.timeout.connect(self.mostrar_datos)
+        for signal in (repo.maquinas_cambiadas, repo.maquinas_eliminadas, repo.prestamos_abiertos, repo.prestamos_cerrados):
+            signal.connect(self.render_timer.start)
+        repo.supervisores_cambiados.connect(self.mostrar_supervisores)
+        repo.sincronizado.connect(self.sincronizado)
+        repo.error.connect(self.error_carga)
 
-    def setup_auto_refresh(self):
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.cargar_datos)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
+        self.mostrar_datos()
+        if repo.supervisores is not None:
+            self.mostrar_supervisores(repo.supervisores)
+        self.cargar_datos()
 
     def init_ui(self):
         main_layout = QVBoxLayout()
@@ -147,11 +159,13 @@ class PrestamosUI(QWidget):
         buttons_frame = QFrame()
         buttons_layout = QVBoxLayout(buttons_frame)
         btn_scan = CloudButton('Escanear QR/Código', primary=True)
+        btn_scan_lote = CloudButton('Escaneo Continuo')
         btn_asignar = CloudButton('→ Asignar')
         btn_liberar = CloudButton('← Liberar')
         
         buttons_layout.addStretch()
         buttons_layout.addWidget(btn_scan)
+        buttons_layout.addWidget(btn_scan_lote)
         buttons_layout.addWidget(btn_asignar)
         buttons_layout.addWidget(btn_liberar)
         buttons_layout.addStretch()
@@ -186,12 +200,13 @@ class PrestamosUI(QWidget):
         
         # Connect signals
         btn_scan.clicked.connect(self.handle_scan)
+        btn_scan_lote.clicked.connect(self.handle_scan_lote)
         btn_asignar.clicked.connect(self.handle_asignar)
         btn_liberar.clicked.connect(self.handle_liberar)
 
     def handle_asignar(self):
-        selected_row = self.tabla_disponibles.currentRow()
-        if selected_row >= 0:
+        rows = self.filas_seleccionadas(self.tabla_disponibles)
+        if rows:
             if not self.combo_supervisores.currentText():
                 self.mostrar_error("Error", "Debe seleccionar un supervisor")
                 return
@@ -199,14 +214,21 @@ class PrestamosUI(QWidget):
                 self.mostrar_error("Error", "Debe especificar una ubicación")
                 return
             
-            self.move_item(self.tabla_disponibles, self.tabla_asignadas)
-            self.status_label.setText('Máquina asignada exitosamente')
+            maquinas = []
+            for row in rows:
+                maquina = self.indice_disponibles.get(self.tabla_disponibles.item(row, 0).text())
+                if maquina is not None:
+                    maquinas.append(maquina)
+            if maquinas and self.asignar_maquinas(maquinas):
+                self.status_label.setText(f'{len(maquinas)} máquina(s) asignada(s) exitosamente')
 
     def handle_liberar(self):
-        selected_row = self.tabla_asignadas.currentRow()
-        if selected_row >= 0:
-            self.move_item(self.tabla_asignadas, self.tabla_disponibles)
-            self.status_label.setText('Máquina liberada exitosamente')
+        rows = self.filas_seleccionadas(self.tabla_asignadas)
+        if rows and self.liberar_filas(rows):
+            self.status_label.setText(f'{len(rows)} máquina(s) liberada(s) exitosamente')
+
+    def filas_seleccionadas(self, tabla):
+        return sorted({index.row() for index in tabla.selectionModel().selectedRows()})
 
     def handle_scan(self):
         self.status_label.setText('Iniciando escaneo...')
@@ -214,62 +236,94 @@ class PrestamosUI(QWidget):
         self.progress_bar.show()
         
         try:
-            cap = cv2.VideoCapture(0)
-            if not cap.isOpened():
-                raise Exception("No se pudo acceder a la cámara")
+            # Capture and decoding run on the dialog's worker thread
+            dialog = EscanerDialog(self)
+            dialog.exec()
+            if dialog.error:
+                raise Exception(dialog.error)
             
-            preview_dialog = QDialog(self)
-            preview_dialog.setWindowTitle("Escáner QR/Código de Barras")
-            preview_layout = QVBoxLayout(preview_dialog)
-            preview_label = QLabel()
-            preview_layout.addWidget(preview_label)
-            preview_dialog.show()
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Update preview
-                rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                qt_image = QImage(rgb_image.data, w, h, ch * w, QImage.Format.Format_RGB888)
-                preview_label.setPixmap(QPixmap.fromImage(qt_image).scaled(
-                    640, 480, Qt.AspectRatioMode.KeepAspectRatio))
-                
-                # Detect codes
-                codes = decode(frame)
-                if codes:
-                    code_data = codes[0].data.decode('utf-8')
-                    cap.release()
-                    preview_dialog.close()
-                    
-                    # Find and move the device
-                    found = False
-                    for row in range(self.tabla_disponibles.rowCount()):
-                        if self.tabla_disponibles.item(row, 0).text() == code_data:
-                            self.tabla_disponibles.selectRow(row)
-                            if self.combo_supervisores.currentText() and self.txt_ubicacion.text():
-                                self.handle_asignar()
-                                found = True
-                                self.status_label.setText(f'Dispositivo {code_data} asignado exitosamente')
-                            else:
-                                self.mostrar_error("Datos Requeridos", "Por favor seleccione un supervisor y especifique una ubicación")
-                            break
-                    
-                    if not found:
-                        self.mostrar_error("Error", f"Dispositivo {code_data} no encontrado o no disponible")
-                    break
-                
-                QApplication.processEvents()
+            code_data = dialog.codigo
+            if code_data:
+                maquina = self.buscar_maquina(code_data)
+                if maquina is None:
+                    self.mostrar_error("Error", f"Dispositivo {code_data} no encontrado o no disponible")
+                elif not self.combo_supervisores.currentText() or not self.txt_ubicacion.text():
+                    self.mostrar_error("Datos Requeridos", "Por favor seleccione un supervisor y especifique una ubicación")
+                elif self.asignar_maquinas([maquina]):
+                    self.status_label.setText(f'Dispositivo {code_data} asignado exitosamente')
+                    return
                 
         except Exception as e:
             self.mostrar_error("Error de Escaneo", str(e))
         finally:
-            if 'cap' in locals() and cap.isOpened():
-                cap.release()
             self.progress_bar.hide()
-            self.status_label.setText('Sistema listo')
+        self.status_label.setText('Sistema listo')
+
+    def handle_scan_lote(self):
+        if not self.combo_supervisores.currentText() or not self.txt_ubicacion.text():
+            self.mostrar_error("Datos Requeridos", "Por favor seleccione un supervisor y especifique una ubicación")
+            return
+        
+        dialog = EscanerDialog(self, continuo=True, resolver=self.buscar_maquina)
+        accepted = dialog.exec() == QDialog.DialogCode.Accepted
+        if dialog.error:
+            self.mostrar_error("Error de Escaneo", dialog.error)
+        if accepted and dialog.maquinas:
+            if self.asignar_maquinas(list(dialog.maquinas.values())):
+                self.status_label.setText(f'{len(dialog.maquinas)} dispositivos asignados exitosamente')
+
+    def buscar_maquina(self, codigo):
+        # Scanned values may be either the machine id or its printed codigo_qr
+        return self.indice_disponibles.get(codigo)
+
+    def asignar_maquinas(self, maquinas):
+        supervisor_id = self.combo_supervisores.currentData()
+        observaciones = f"Ubicación: {self.txt_ubicacion.text()}, Evento: {self.txt_codigo_evento.text()}"
+        prestamos = [
+            {
+                'id': str(uuid.uuid4()),
+                'maquina_id': maquina.id,
+                'supervisor_id': supervisor_id,
+                'observaciones': observaciones
+            }
+            for maquina in maquinas
+        ]
+        
+        # All loans of a batch go in together or not at all; the tables update from the repository sync
+        if not self.repo.abrir_prestamos(prestamos):
+            self.mostrar_error("Error", "No se pudieron registrar los préstamos")
+            return False
+        for maquina in maquinas:
+            self.quitar_del_indice(maquina)
+        return True
+
+    def liberar_filas(self, rows):
+        prestamo_ids = []
+        for row in rows:
+            prestamo_id = self.tabla_asignadas.item(row, 0).data(Qt.ItemDataRole.UserRole)
+            if prestamo_id is None:
+                prestamo = self.repo.prestamo_activo(self.tabla_asignadas.item(row, 0).text())
+                if prestamo is None:
+                    self.mostrar_error("Error", f"El dispositivo {self.tabla_asignadas.item(row, 0).text()} no tiene un préstamo activo")
+                    return False
+                prestamo_id = prestamo.id
+            prestamo_ids.append(prestamo_id)
+        if not self.repo.cerrar_prestamos(prestamo_ids):
+            self.mostrar_error("Error", "No se pudieron finalizar los préstamos")
+            return False
+        return True
+
+    def indexar_disponibles(self, disponibles):
+        self.indice_disponibles = {}
+        for maquina in disponibles:
+            self.indice_disponibles[maquina.id] = maquina
+            if maquina.codigo_qr:
+                self.indice_disponibles[maquina.codigo_qr] = maquina
+
+    def quitar_del_indice(self, maquina):
+        self.indice_disponibles.pop(maquina.id, None)
+        if maquina.codigo_qr:
+            self.indice_disponibles.pop(maquina.codigo_qr, None)
 
     def process_scanned_code(self, code_data):
         # Find and select the machine in available table
@@ -281,77 +335,41 @@ class PrestamosUI(QWidget):
         
         self.mostrar_error("Error", "Máquina no encontrada o no disponible")
 
-    def move_item(self, source, destination):
-        selected_row = source.currentRow()
-        if selected_row >= 0:
-            machine_id = source.item(selected_row, 0).text()
-            machine_name = source.item(selected_row, 1).text()
-            
-            if destination == self.tabla_asignadas:
-                # Moving to assigned
-                prestamo_id = str(uuid.uuid4())
-                prestamo_data = {
-                    'id': prestamo_id,
-                    'maquina_id': machine_id,
-                    'supervisor_id': self.combo_supervisores.currentData(),
-                    'observaciones': f"Ubicación: {self.txt_ubicacion.text()}, Evento: {self.txt_codigo_evento.text()}"
-                }
-                
-                if self.db.crear_prestamo(prestamo_data):
-                    row_position = destination.rowCount()
-                    destination.insertRow(row_position)
-                    destination.setItem(row_position, 0, QTableWidgetItem(machine_id))
-                    destination.setItem(row_position, 1, QTableWidgetItem(machine_name))
-                    destination.setItem(row_position, 2, QTableWidgetItem(self.combo_supervisores.currentText()))
-                    destination.setItem(row_position, 3, QTableWidgetItem(self.txt_ubicacion.text()))
-                    destination.setItem(row_position, 4, QTableWidgetItem(datetime.now().strftime('%Y-%m-%d %H:%M')))
-                    source.removeRow(selected_row)
-            else:
-                # Moving to available
-                prestamos = self.db.obtener_prestamos({'maquina_id': machine_id})
-                if prestamos:
-                    prestamo_id = prestamos[0]['id']
-                    if self.db.finalizar_prestamo(prestamo_id):
-                        row_position = destination.rowCount()
-                        destination.insertRow(row_position)
-                        destination.setItem(row_position, 0, QTableWidgetItem(machine_id))
-                        destination.setItem(row_position, 1, QTableWidgetItem(machine_name))
-                        destination.setItem(row_position, 2, QTableWidgetItem(''))
-                        destination.setItem(row_position, 3, QTableWidgetItem(self.txt_ubicacion.text()))
-                        source.removeRow(selected_row)
-
     def cargar_datos(self):
-        try:
-            # Load available machines
-            disponibles = self.db.obtener_maquinas_disponibles()
-            self.tabla_disponibles.setRowCount(len(disponibles))
-            for i, maq in enumerate(disponibles):
-                self.tabla_disponibles.setItem(i, 0, QTableWidgetItem(maq['id']))
-                self.tabla_disponibles.setItem(i, 1, QTableWidgetItem(maq['nombre']))
-                self.tabla_disponibles.setItem(i, 2, QTableWidgetItem(maq['categoria']))
-                self.tabla_disponibles.setItem(i, 3, QTableWidgetItem(maq.get('ubicacion', '')))
+        self.repo.sincronizar()
 
-            # Load active loans
-            prestamos = self.db.obtener_prestamos({'fecha_devolucion': None})
-            self.tabla_asignadas.setRowCount(len(prestamos))
-            for i, prestamo in enumerate(prestamos):
-                self.tabla_asignadas.setItem(i, 0, QTableWidgetItem(prestamo['maquina_id']))
-                self.tabla_asignadas.setItem(i, 1, QTableWidgetItem(prestamo['maquina_nombre']))
-                self.tabla_asignadas.setItem(i, 2, QTableWidgetItem(prestamo['supervisor_nombre']))
-                self.tabla_asignadas.setItem(i, 3, QTableWidgetItem(prestamo.get('ubicacion', '')))
-                loan_time = datetime.now() - prestamo['fecha_prestamo']
-                self.tabla_asignadas.setItem(i, 4, QTableWidgetItem(f"{loan_time.days}d {loan_time.seconds//3600}h"))
+    def mostrar_datos(self):
+        # Drawn from the repository's memory; no database access here
+        try:
+            # Only rows that were added, removed or changed touch the tables
+            disponibles = self.repo.maquinas_disponibles()
+            self.indexar_disponibles(disponibles)
+            self.sync_disponibles.aplicar(
+                (maq.id, (maq.id, maq.nombre, maq.categoria or '', maq.ubicacion or ''), None)
+                for maq in disponibles
+            )
 
-            # Load supervisors
-            self.combo_supervisores.clear()
-            supervisores = self.db.obtener_supervisores()
-            for sup in supervisores:
-                self.combo_supervisores.addItem(f"{sup['nombre']} ({sup['id']})", sup['id'])
+            ahora = datetime.now()
+            filas = []
+            for prestamo in self.repo.prestamos.values():
+                loan_time = ahora - prestamo.fecha_prestamo
+                filas.append((prestamo.id, (prestamo.maquina_id, prestamo.maquina_nombre, prestamo.supervisor_nombre,
+                                            '', f"{loan_time.days}d {loan_time.seconds//3600}h"), prestamo.id))
+            self.sync_asignadas.aplicar(filas)
 
-            self.status_label.setText('Datos actualizados: ' + datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-            
         except Exception as e:
             self.mostrar_error("Error de carga", f"Error al cargar datos: {str(e)}")
 
+    def mostrar_supervisores(self, supervisores):
+        sincronizar_combo(self.combo_supervisores, [(f"{sup['nombre']} ({sup['id']})", sup['id']) for sup in supervisores])
+
+    def sincronizado(self):
+        self.status_label.setText('Datos actualizados: ' + datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    def error_carga(self, mensaje):
+        if not self.isVisible():
+            return
+        self.mostrar_error("Error de carga", f"Error al cargar datos: {mensaje}")
+
     def mostrar_error(self, titulo, mensaje):
         QMessageBox.critical(self, titulo, mensaje)
\ No newline at end of file
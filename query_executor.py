@@ -0,0 +1,85 @@
+import itertools
+from typing import Callable, Dict
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class QuerySignals(QObject):
+    finished = pyqtSignal(str, int, object)
+    failed = pyqtSignal(str, int, str)
+
+class QueryTask(QRunnable):
+    def __init__(self, key: str, ticket: int, fn: Callable):
+        super().__init__()
+        # The executor keeps the Python reference alive until the task reports back
+        self.setAutoDelete(False)
+        self.key = key
+        self.ticket = ticket
+        self.fn = fn
+        self.cancelled = False
+        self.signals = QuerySignals()
+
+    def run(self):
+        if self.cancelled:
+            self.signals.failed.emit(self.key, self.ticket, 'cancelled')
+            return
+        try:
+            result = self.fn()
+        except Exception as e:
+            self.signals.failed.emit(self.key, self.ticket, str(e))
+        else:
+            self.signals.finished.emit(self.key, self.ticket, result)
+
+class QueryExecutor(QObject):
+    def __init__(self, parent=None, pool: QThreadPool = None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self._tickets = itertools.count(1)
+        self._pending: Dict[str, tuple] = {}
+        self._running = {}
+
+    def submit(self, key: str, fn: Callable, on_result: Callable, on_error: Callable = None) -> int:
+        # A newer request for the same key supersedes the older one: it is dropped from the
+        # queue if it has not started yet, and its result is discarded if it has
+        self.cancel(key)
+        ticket = next(self._tickets)
+        task = QueryTask(key, ticket, fn)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._pending[key] = (ticket, on_result, on_error)
+        self._running[ticket] = task
+        self.pool.start(task)
+        return ticket
+
+    def cancel(self, key: str):
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            return
+        task = self._running.get(entry[0])
+        if task is not None:
+            task.cancelled = True
+            if self.pool.tryTake(task):
+                del self._running[entry[0]]
+
+    def cancel_all(self):
+        for key in list(self._pending):
+            self.cancel(key)
+
+    def is_pending(self, key: str) -> bool:
+        return key in self._pending
+
+    def _take(self, key: str, ticket: int):
+        self._running.pop(ticket, None)
+        entry = self._pending.get(key)
+        if entry is None or entry[0] != ticket:
+            return None
+        del self._pending[key]
+        return entry
+
+    def _on_finished(self, key: str, ticket: int, result):
+        entry = self._take(key, ticket)
+        if entry is not None:
+            entry[1](result)
+
+    def _on_failed(self, key: str, ticket: int, message: str):
+        entry = self._take(key, ticket)
+        if entry is not None and entry[2] is not None:
+            entry[2](message)
@@ -0,0 +1,76 @@
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+class QueryStats:
+    def __init__(self, slow_threshold_ms: float = 500, window_seconds: float = 60, slow_log_size: int = 50):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self.total = 0
+        self.errores = 0
+        self.lentas = 0
+        self.por_metodo: Dict[str, Dict] = {}
+        # (timestamp, ms, error) of recent queries, trimmed to window_seconds on read
+        self._recientes = deque()
+        self.ultimas_lentas = deque(maxlen=slow_log_size)
+
+    def record(self, query: str, elapsed: float, filas: int, error: bool = False, metodo: str = None):
+        ms = elapsed * 1000
+        metodo = metodo or 'desconocido'
+        ahora = time.time()
+        lenta = ms >= self.slow_threshold_ms
+        with self._lock:
+            self.total += 1
+            self.errores += error
+            stats = self.por_metodo.setdefault(metodo, {'consultas': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'filas': 0, 'errores': 0})
+            stats['consultas'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            stats['filas'] += filas
+            stats['errores'] += error
+            self._recientes.append((ahora, ms, error))
+            if lenta:
+                self.lentas += 1
+                self.ultimas_lentas.append({
+                    'fecha': ahora,
+                    'metodo': metodo,
+                    'ms': ms,
+                    'filas': filas,
+                    'query': " ".join(query.split())[:300]
+                })
+        if lenta:
+            print(f"[WARNING] Slow query ({ms:.0f} ms, {filas} rows) in {metodo}: {' '.join(query.split())[:200]}")
+
+    def snapshot(self) -> Dict:
+        limite = time.time() - self.window_seconds
+        with self._lock:
+            while self._recientes and self._recientes[0][0] < limite:
+                self._recientes.popleft()
+            recientes = list(self._recientes)
+            por_metodo = {metodo: dict(stats) for metodo, stats in self.por_metodo.items()}
+            ultimas_lentas = list(self.ultimas_lentas)
+            total, errores, lentas = self.total, self.errores, self.lentas
+        return {
+            'consultas': total,
+            'errores': errores,
+            'lentas': lentas,
+            'ventana_consultas': len(recientes),
+            'ventana_errores': sum(1 for _, _, error in recientes if error),
+            'ventana_promedio_ms': sum(ms for _, ms, _ in recientes) / len(recientes) if recientes else 0.0,
+            'ventana_max_ms': max((ms for _, ms, _ in recientes), default=0.0),
+            'por_metodo': por_metodo,
+            'ultimas_lentas': ultimas_lentas
+        }
+
+def metodo_llamador(modulo: str) -> str:
+    # The first public method of `modulo` on the stack is the API the caller used; private
+    # helpers such as _execute_read are skipped
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_globals.get('__name__') == modulo and not frame.f_code.co_name.startswith('_'):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return 'desconocido'
@@ -0,0 +1,73 @@
+from typing import Callable, Dict, Optional
+from PyQt6.QtCore import QObject, QTimer, Qt
+from PyQt6.QtGui import QGuiApplication
+from PyQt6.QtWidgets import QStackedWidget, QWidget
+
+class RefreshScheduler(QObject):
+    def __init__(self, stack: QStackedWidget, interval_ms: int = 30000, coalesce_ms: int = 250,
+                 available: Optional[Callable[[], bool]] = None, parent=None):
+        super().__init__(parent)
+        self.stack = stack
+        self.available = available
+        self._callbacks: Dict[QWidget, Callable] = {}
+        self._stale = set()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._on_tick)
+
+        # Requests that arrive within coalesce_ms of each other collapse into one reload
+        self._coalesce = QTimer(self)
+        self._coalesce.setSingleShot(True)
+        self._coalesce.setInterval(coalesce_ms)
+        self._coalesce.timeout.connect(self._refresh_current)
+
+        self.stack.currentChanged.connect(self._on_current_changed)
+        QGuiApplication.instance().applicationStateChanged.connect(self._on_application_state_changed)
+        if self._is_active():
+            self.timer.start()
+
+    def register(self, widget: QWidget, callback: Callable):
+        # Widgets register right after construction, which already started their first load
+        self._callbacks[widget] = callback
+        self._stale.discard(widget)
+
+    def request_refresh(self):
+        # After a write: hidden tabs reload when they are shown again. The current tab is left
+        # alone, the write already resynced it.
+        current = self.stack.currentWidget()
+        self._stale.update(widget for widget in self._callbacks if widget is not current)
+
+    def _is_active(self) -> bool:
+        return QGuiApplication.applicationState() == Qt.ApplicationState.ApplicationActive
+
+    def _on_tick(self):
+        # Hidden tabs are only marked; they reload when they are shown again
+        self._stale.update(self._callbacks)
+        self._coalesce.start()
+
+    def _on_current_changed(self, index: int):
+        if self.stack.currentWidget() in self._stale:
+            self._coalesce.start()
+
+    def _on_application_state_changed(self, state):
+        if state == Qt.ApplicationState.ApplicationActive:
+            self.timer.start()
+            if self.stack.currentWidget() in self._stale:
+                self._coalesce.start()
+        else:
+            self.timer.stop()
+            self._coalesce.stop()
+
+    def _refresh_current(self):
+        if not self._is_active():
+            return
+        widget = self.stack.currentWidget()
+        callback = self._callbacks.get(widget)
+        if callback is None or widget not in self._stale:
+            return
+        if self.available is not None and not self.available():
+            # Stays stale and is retried on the next tick
+            return
+        self._stale.discard(widget)
+        callback()
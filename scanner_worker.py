@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+import cv2
+from pyzbar.pyzbar import decode
+from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtGui import QImage
+
+class ScannerWorker(QThread):
+    codigo_detectado = pyqtSignal(str)
+    frame_ready = pyqtSignal(QImage)
+    error = pyqtSignal(str)
+
+    def __init__(self, camera_index: int = 0, decode_interval_ms: int = 100, decode_width: int = 640,
+                 roi: float = 0.8, preview_size=(640, 480), queue_size: int = 2,
+                 dedupe_window_ms: int = 2000, parent=None):
+        super().__init__(parent)
+        self.camera_index = camera_index
+        self.decode_interval = decode_interval_ms / 1000.0
+        self.decode_width = decode_width
+        # Fraction of the frame, centered, that is handed to the decoder
+        self.roi = roi
+        self.preview_size = preview_size
+        # Bounded so a slow decoder never works through a backlog of old frames
+        self.frames = queue.Queue(maxsize=queue_size)
+        # A code held in front of the camera is reported once per window, not once per frame
+        self.dedupe_window = dedupe_window_ms / 1000.0
+        self._vistos = {}
+        self._running = threading.Event()
+        # Only stop() sets this and nothing clears it, so a stop that arrives while the camera
+        # is still opening is not undone when the loops start
+        self._stop_requested = threading.Event()
+        self._capture_thread = None
+
+    def stop(self):
+        self._stop_requested.set()
+        self._running.clear()
+
+    def _activo(self) -> bool:
+        return self._running.is_set() and not self._stop_requested.is_set()
+
+    def run(self):
+        cap = cv2.VideoCapture(self.camera_index)
+        if not cap.isOpened():
+            self.error.emit("No se pudo acceder a la cámara")
+            return
+        if self._stop_requested.is_set():
+            cap.release()
+            return
+
+        self._running.set()
+        self._capture_thread = threading.Thread(target=self._capture, args=(cap,), daemon=True)
+        self._capture_thread.start()
+        try:
+            self._decode_loop()
+        finally:
+            self._running.clear()
+            self._capture_thread.join()
+            cap.release()
+
+    def _capture(self, cap):
+        while self._activo():
+            ret, frame = cap.read()
+            if not ret:
+                self.error.emit("No se pudo leer de la cámara")
+                self._running.clear()
+                break
+            self._put_latest(frame)
+
+    def _put_latest(self, frame):
+        # Drop the oldest frame instead of blocking the camera
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _decode_loop(self):
+        next_decode = 0.0
+        while self._activo():
+            try:
+                frame = self.frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            self.frame_ready.emit(self._preview(frame))
+
+            now = time.monotonic()
+            if now < next_decode:
+                continue
+            next_decode = now + self.decode_interval
+
+            # Codes last seen before the window would be reported again anyway; forget them
+            for codigo in [codigo for codigo, visto in self._vistos.items() if now - visto > self.dedupe_window]:
+                del self._vistos[codigo]
+
+            for code in decode(self._prepare(frame)):
+                codigo = code.data.decode('utf-8')
+                visto = self._vistos.get(codigo)
+                self._vistos[codigo] = now
+                if visto is None or now - visto > self.dedupe_window:
+                    self.codigo_detectado.emit(codigo)
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        if self.roi < 1.0:
+            ch, cw = int(h * self.roi), int(w * self.roi)
+            y, x = (h - ch) // 2, (w - cw) // 2
+            frame = frame[y:y + ch, x:x + cw]
+            h, w = ch, cw
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if w > self.decode_width:
+            scale = self.decode_width / w
+            gray = cv2.resize(gray, (self.decode_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _preview(self, frame) -> QImage:
+        h, w = frame.shape[:2]
+        scale = min(self.preview_size[0] / w, self.preview_size[1] / h, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        h, w, ch = rgb_image.shape
+        # copy() detaches the image from the numpy buffer before it crosses threads
+        return QImage(rgb_image.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
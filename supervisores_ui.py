@@ -1,12 +1,19 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
     QPushButton, QHeaderView, QMessageBox, QLineEdit, QComboBox, QLabel, QFrame,
-    QProgressBar, QScrollArea, QGridLayout, QSpacerItem, QSizePolicy, QDialog)
-from PyQt6.QtCore import Qt, QTimer, QSize, pyqtSignal
+    QProgressBar, QScrollArea, QGridLayout, QSpacerItem, QSizePolicy, QDialog, QTableView,
+    QAbstractItemView, QStyledItemDelegate)
+from PyQt6.QtCore import Qt, QTimer, QSize, QRect, QEvent, pyqtSignal
 from PyQt6.QtGui import QColor, QIcon, QPainter, QPalette, QLinearGradient
 from PyQt6.QtCharts import QChart, QChartView, QPieSeries, QBarSeries, QBarSet, QBarCategoryAxis, QValueAxis
 from db_manager import DatabaseManager
+from inventory_repository import InventoryRepository
+from filtered_table_model import FilteredTableModel, busqueda_diferida
+from query_executor import QueryExecutor
 from nuevo_supervisor_dialog import NuevoSupervisorDialog
+from editar_supervisor_dialog import EditarSupervisorDialog
 from datetime import datetime, timedelta
+from functools import lru_cache
+import csv
 import uuid
 
 class EnterpriseMetricCard(QFrame):
@@ -38,19 +45,104 @@ class EnterpriseMetricCard(QFrame):
         value_label.setStyleSheet('font-size: 24px; font-weight: bold; color: #FFFFFF;')
         layout.addWidget(value_label)
 
+def fila_supervisor(supervisor) -> tuple:
+    last_active = supervisor.get('ultima_actividad')
+    if isinstance(last_active, str):
+        last_active = datetime.fromisoformat(last_active)
+    return (
+        supervisor.get('id', 'N/A'),
+        supervisor.get('nombre', 'N/A'),
+        supervisor.get('email') or '',
+        supervisor.get('telefono') or '',
+        supervisor.get('permiso') or '',
+        supervisor.get('status', 'Active'),
+        last_active.strftime('%Y-%m-%d %H:%M') if last_active else 'N/A'
+    )
+
+@lru_cache(maxsize=None)
+def icono_accion(nombre: str) -> QIcon:
+    # Read from disk once per process, not once per row on every refresh
+    return QIcon(f'icons/{nombre}.png')
+
+class SupervisoresTableModel(FilteredTableModel):
+    # One tuple per supervisor (see fila_supervisor), searched by name; the actions column has no data of its own
+    HEADERS = ['ID', 'Name', 'Email', 'Phone', 'Role', 'Status', 'Last Active', 'Actions']
+    ROLE_COLUMN = 4
+    STATUS_COLUMN = 5
+    ACTIONS_COLUMN = 7
+    STATUS_COLORS = {
+        'Active': QColor('#28A745'),
+        'Inactive': QColor('#DC3545'),
+        'Pending': QColor('#FFC107')
+    }
+    DEFAULT_STATUS_COLOR = QColor('#6C757D')
+
+    def set_filters(self, search_text, role, status):
+        filtros = {}
+        if role != 'All Roles':
+            filtros[self.ROLE_COLUMN] = role
+        if status != 'All Status':
+            filtros[self.STATUS_COLUMN] = status
+        self.filtrar(search_text, filtros)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role == Qt.ItemDataRole.BackgroundRole and index.column() == self.STATUS_COLUMN:
+            return self.STATUS_COLORS.get(self.fila(index.row())[self.STATUS_COLUMN], self.DEFAULT_STATUS_COLOR)
+        return super().data(index, role)
+
+class SupervisorActionsDelegate(QStyledItemDelegate):
+    # Paints the view/edit/delete icons of the actions column and hit-tests clicks on them,
+    # so rows need no widgets of their own
+    ACCIONES = ('view', 'edit', 'delete')
+    # Drawn when an icon file is missing so the action stays usable
+    TEXTOS = {'view': '👁', 'edit': '✎', 'delete': '🗑'}
+    ICON_SIZE = 24
+    SPACING = 4
+    # action name, supervisor id
+    accion_activada = pyqtSignal(str, str)
+
+    def rectangulos(self, rect):
+        x = rect.left() + self.SPACING
+        y = rect.top() + (rect.height() - self.ICON_SIZE) // 2
+        for accion in self.ACCIONES:
+            yield accion, QRect(x, y, self.ICON_SIZE, self.ICON_SIZE)
+            x += self.ICON_SIZE + self.SPACING
+
+    def paint(self, painter, option, index):
+        # The base class draws the background and selection; the icons go on top
+        super().paint(painter, option, index)
+        for accion, rect in self.rectangulos(option.rect):
+            icono = icono_accion(accion)
+            if icono.isNull():
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, self.TEXTOS[accion])
+            else:
+                icono.paint(painter, rect)
+
+    def sizeHint(self, option, index):
+        return QSize(len(self.ACCIONES) * (self.ICON_SIZE + self.SPACING) + self.SPACING,
+                     self.ICON_SIZE + 2 * self.SPACING)
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton):
+            for accion, rect in self.rectangulos(option.rect):
+                if rect.contains(event.position().toPoint()):
+                    self.accion_activada.emit(accion, index.siblingAtColumn(0).data())
+                    return True
+        return super().editorEvent(event, model, option, index)
+
 class SupervisoresUI(QWidget):
-    def __init__(self, db: DatabaseManager):
+    def __init__(self, repo: InventoryRepository):
         super().__init__()
-        self.db = db
+        self.repo = repo
         self.setup_ui()
-        self.setup_auto_refresh()
+        repo.supervisores_cambiados.connect(self.mostrar_datos)
+        repo.sincronizado.connect(self.sincronizado)
+        repo.error.connect(self.error_carga)
+        if repo.supervisores is not None:
+            self.mostrar_datos(repo.supervisores)
         self.cargar_datos()
 
-    def setup_auto_refresh(self):
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.cargar_datos)
-        self.refresh_timer.start(30000)  # Refresh every 30 seconds
-
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
         main_layout.setSpacing(20)
@@ -66,7 +158,7 @@ class SupervisoresUI(QWidget):
         search_layout = QHBoxLayout(search_box)
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText('Search supervisors...')
-        self.search_input.textChanged.connect(self.filter_supervisors)
+        self.search_timer = busqueda_diferida(self.search_input, self.filter_supervisors)
         self.search_input.setStyleSheet("""
             QLineEdit {
                 background: #3D3D3D;
@@ -155,20 +247,24 @@ class SupervisoresUI(QWidget):
         content_layout = QVBoxLayout(content)
 
         # Enhanced table
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(8)
-        self.tabla.setHorizontalHeaderLabels([
-            'ID', 'Name', 'Email', 'Phone', 'Role', 'Status',
-            'Last Active', 'Actions'
-        ])
+        self.modelo = SupervisoresTableModel(self)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.tabla.setSortingEnabled(True)
+        self.tabla.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.acciones = SupervisorActionsDelegate(self.tabla)
+        self.acciones.accion_activada.connect(self.ejecutar_accion)
+        self.tabla.setItemDelegateForColumn(SupervisoresTableModel.ACTIONS_COLUMN, self.acciones)
         
         self.tabla.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #2D2D2D;
                 border: none;
                 gridline-color: #404040;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 8px;
                 color: white;
             }
@@ -181,7 +277,12 @@ class SupervisoresUI(QWidget):
             }
         """)
         
-        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        header_view = self.tabla.horizontalHeader()
+        header_view.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        header_view.setSectionResizeMode(SupervisoresTableModel.ACTIONS_COLUMN, QHeaderView.ResizeMode.Fixed)
+        header_view.resizeSection(SupervisoresTableModel.ACTIONS_COLUMN, self.acciones.sizeHint(None, None).width())
+        # Fixed row heights let the view skip measuring rows it never shows
+        self.tabla.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         content_layout.addWidget(self.tabla)
 
         # Status bar
@@ -226,82 +327,49 @@ class SupervisoresUI(QWidget):
         self.status_filter.currentTextChanged.connect(self.filter_supervisors)
 
     def cargar_datos(self):
-        try:
-            self.status_label.setText('Loading data...')
-            self.progress_bar.setRange(0, 0)
-            self.progress_bar.show()
-            
-            supervisores = self.db.obtener_supervisores()
-            self.tabla.setRowCount(0)
-            
-            if not supervisores:
-                self.mostrar_estado_vacio('No supervisors registered')
-                return
-
-            self.tabla.setRowCount(len(supervisores))
-            for i, supervisor in enumerate(supervisores):
-                self.tabla.setItem(i, 0, QTableWidgetItem(supervisor.get('id', 'N/A')))
-                self.tabla.setItem(i, 1, QTableWidgetItem(supervisor.get('nombre', 'N/A')))
-                self.tabla.setItem(i, 2, QTableWidgetItem(supervisor['email']))
-                self.tabla.setItem(i, 3, QTableWidgetItem(supervisor['telefono']))
-                self.tabla.setItem(i, 4, QTableWidgetItem(supervisor['permiso']))
-                
-                # Enhanced status cell with color coding
-                status_item = QTableWidgetItem(supervisor.get('status', 'Active'))
-                status_colors = {
-                    'Active': '#28A745',
-                    'Inactive': '#DC3545',
-                    'Pending': '#FFC107'
-                }
-                status_item.setBackground(
-                    QColor(status_colors.get(supervisor.get('status', 'Active'), '#6C757D'))
-                )
-                self.tabla.setItem(i, 5, status_item)
-                
-                # Last active timestamp
-                last_active = supervisor.get('ultima_actividad', datetime.now())
-                if isinstance(last_active, str):
-                    last_active = datetime.fromisoformat(last_active)
-                self.tabla.setItem(i, 6, QTableWidgetItem(last_active.strftime('%Y-%m-%d %H:%M')))
-                
-                # Action buttons cell
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(4, 4, 4, 4)
-                
-                btn_view = QPushButton(QIcon('icons/view.png'), '')
-                btn_edit = QPushButton(QIcon('icons/edit.png'), '')
-                btn_delete = QPushButton(QIcon('icons/delete.png'), '')
-                
-                for btn in [btn_view, btn_edit, btn_delete]:
-                    btn.setFixedSize(24, 24)
-                    btn.setStyleSheet('background: transparent; border: none;')
-                    actions_layout.addWidget(btn)
-                
-                self.tabla.setCellWidget(i, 7, actions_widget)
-            
-            self.status_label.setText(f'Data updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
-            
-        except Exception as e:
-            self.mostrar_error('Loading Error', f'Could not load supervisors: {str(e)}')
-        finally:
-            self.progress_bar.hide()
+        self.status_label.setText('Loading data...')
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.repo.recargar_supervisores()
+
+    def mostrar_datos(self, supervisores):
+        self.modelo.aplicar([fila_supervisor(s) for s in supervisores])
+        self.progress_bar.hide()
+        if not self.modelo.rows:
+            self.status_label.setText('No supervisors registered')
+            return
+        self.status_label.setText(f'Data updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+
+    def sincronizado(self):
+        self.progress_bar.hide()
+        self.status_label.setText(f'Data updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}')
+
+    def error_carga(self, mensaje):
+        self.progress_bar.hide()
+        if not self.isVisible():
+            return
+        self.mostrar_error('Loading Error', f'Could not load supervisors: {mensaje}')
 
     def filter_supervisors(self):
-        search_text = self.search_input.text().lower()
-        role = self.role_filter.currentText()
-        status = self.status_filter.currentText()
-        
-        for row in range(self.tabla.rowCount()):
-            name = self.tabla.item(row, 1).text().lower()
-            supervisor_role = self.tabla.item(row, 4).text()
-            supervisor_status = self.tabla.item(row, 5).text()
-            
-            name_match = search_text in name
-            role_match = role == 'All Roles' or role == supervisor_role
-            status_match = status == 'All Status' or status == supervisor_status
-            
-            self.tabla.setRowHidden(row, not (name_match and role_match and status_match))
+        self.modelo.set_filters(
+            self.search_input.text(),
+            self.role_filter.currentText(),
+            self.status_filter.currentText()
+        )
+
+    def supervisor_seleccionado(self):
+        index = self.tabla.currentIndex()
+        if not index.isValid():
+            return None
+        return self.modelo.fila(index.row())[0]
+
+    def ejecutar_accion(self, accion, supervisor_id):
+        if accion == 'view':
+            self.abrir_auditoria(supervisor_id)
+        elif accion == 'edit':
+            self.editar_supervisor(supervisor_id)
+        elif accion == 'delete':
+            self.confirmar_eliminacion(supervisor_id)
 
     def export_data(self):
         try:
@@ -316,13 +384,7 @@ class SupervisoresUI(QWidget):
                 headers = ['ID', 'Name', 'Email', 'Phone', 'Role', 'Status', 'Last Active']
                 writer.writerow(headers)
                 
-                for row in range(self.tabla.rowCount()):
-                    if not self.tabla.isRowHidden(row):
-                        row_data = []
-                        for col in range(self.tabla.columnCount() - 1):  # Exclude actions column
-                            item = self.tabla.item(row, col)
-                            row_data.append(item.text() if item else '')
-                        writer.writerow(row_data)
+                writer.writerows(self.modelo.filas_mostradas())
             
             self.status_label.setText(f'Export completed: {filename}')
             self.progress_bar.setValue(100)
@@ -339,23 +401,18 @@ class SupervisoresUI(QWidget):
             self.progress_bar.hide()
 
     def show_audit_log(self):
-        selected_row = self.tabla.currentRow()
-        if selected_row >= 0:
-            supervisor_id = self.tabla.item(selected_row, 0).text()
-            try:
-                audit_logs = self.db.obtener_audit_logs(supervisor_id)
-                dialog = AuditLogDialog(audit_logs, self)
-                dialog.exec()
-            except Exception as e:
-                self.mostrar_error('Audit Log Error', f'Could not load audit logs: {str(e)}')
+        supervisor_id = self.supervisor_seleccionado()
+        if supervisor_id is not None:
+            self.abrir_auditoria(supervisor_id)
         else:
             self.mostrar_error('Selection Required', 'Please select a supervisor to view audit logs')
 
-    def mostrar_estado_vacio(self, mensaje):
-        self.tabla.setRowCount(1)
-        self.tabla.setItem(0, 0, QTableWidgetItem(mensaje))
-        self.tabla.item(0, 0).setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.tabla.setSpan(0, 0, 1, self.tabla.columnCount())
+    def abrir_auditoria(self, supervisor_id):
+        try:
+            dialog = AuditLogDialog(self.repo.db, supervisor_id, self)
+            dialog.exec()
+        except Exception as e:
+            self.mostrar_error('Audit Log Error', f'Could not load audit logs: {str(e)}')
 
     def mostrar_error(self, titulo, mensaje):
         msg = QMessageBox(self)
@@ -365,11 +422,11 @@ class SupervisoresUI(QWidget):
         msg.exec()
 
     def abrir_dialogo_nuevo(self):
-        dialog = NuevoSupervisorDialog(self.db)
+        dialog = NuevoSupervisorDialog(self.repo.db)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             data = dialog.get_data()
             try:
-                self.db.insertar_supervisor(
+                self.repo.insertar_supervisor(
                     data['id'],
                     data['nombre'],
                     data['email'],
@@ -377,61 +434,71 @@ class SupervisoresUI(QWidget):
                     data['permiso'],
                     data['auth_provider']
                 )
-                self.cargar_datos()
             except Exception as e:
                 self.mostrar_error('Error', f'Could not create supervisor: {str(e)}')
 
     def abrir_dialogo_editar(self):
-        selected_row = self.tabla.currentRow()
-        if selected_row >= 0:
-            supervisor_id = self.tabla.item(selected_row, 0).text()
-            try:
-                dialog = EditarSupervisorDialog(self.db, supervisor_id)
-                if dialog.exec() == QDialog.DialogCode.Accepted:
-                    data = dialog.get_data()
-                    self.db.actualizar_supervisor(
-                        data['id'],
-                        data['nombre'],
-                        data['email'],
-                        data['telefono'],
-                        data['permiso'],
-                        data['auth_provider']
-                    )
-                    self.cargar_datos()
-            except Exception as e:
-                self.mostrar_error('Error', f'Could not edit supervisor: {str(e)}')
+        supervisor_id = self.supervisor_seleccionado()
+        if supervisor_id is not None:
+            self.editar_supervisor(supervisor_id)
         else:
             self.mostrar_error('Selection Required', 'Please select a supervisor to edit')
 
+    def editar_supervisor(self, supervisor_id):
+        try:
+            dialog = EditarSupervisorDialog(self.repo.db, supervisor_id)
+            if dialog.exec() == QDialog.DialogCode.Accepted:
+                data = dialog.get_data()
+                self.repo.actualizar_supervisor(
+                    data['id'],
+                    data['nombre'],
+                    data['email'],
+                    data['telefono'],
+                    data['permiso'],
+                    data['auth_provider']
+                )
+        except Exception as e:
+            self.mostrar_error('Error', f'Could not edit supervisor: {str(e)}')
+
     def eliminar_supervisor(self):
-        selected_row = self.tabla.currentRow()
-        if selected_row >= 0:
-            supervisor_id = self.tabla.item(selected_row, 0).text()
-            confirm = QMessageBox()
-            confirm.setIcon(QMessageBox.Icon.Question)
-            confirm.setWindowTitle('Confirm Deletion')
-            confirm.setText('Are you sure you want to delete this supervisor?')
-            confirm.setStandardButtons(
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            
-            if confirm.exec() == QMessageBox.StandardButton.Yes:
-                try:
-                    self.db.eliminar_supervisor(supervisor_id)
-                    self.cargar_datos()
-                except Exception as e:
-                    self.mostrar_error('Deletion Error', f'Could not delete supervisor: {str(e)}')
+        supervisor_id = self.supervisor_seleccionado()
+        if supervisor_id is not None:
+            self.confirmar_eliminacion(supervisor_id)
         else:
             self.mostrar_error('Selection Required', 'Please select a supervisor to delete')
 
+    def confirmar_eliminacion(self, supervisor_id):
+        confirm = QMessageBox()
+        confirm.setIcon(QMessageBox.Icon.Question)
+        confirm.setWindowTitle('Confirm Deletion')
+        confirm.setText('Are you sure you want to delete this supervisor?')
+        confirm.setStandardButtons(
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        
+        if confirm.exec() == QMessageBox.StandardButton.Yes:
+            try:
+                self.repo.eliminar_supervisor(supervisor_id)
+            except Exception as e:
+                self.mostrar_error('Deletion Error', f'Could not delete supervisor: {str(e)}')
+
 class AuditLogDialog(QDialog):
-    def __init__(self, logs, parent=None):
+    PAGE_SIZE = 50
+
+    def __init__(self, db: DatabaseManager, usuario_id: str, parent=None):
         super().__init__(parent)
+        self.db = db
+        self.usuario_id = usuario_id
+        self.executor = QueryExecutor(self)
+        # Continuation token of the next page; None once every entry is shown
+        self.cursor = None
+        self.cargando = False
         self.setWindowTitle('Audit Log')
         self.setMinimumSize(600, 400)
-        self.setup_ui(logs)
+        self.setup_ui()
+        self.cargar_pagina()
 
-    def setup_ui(self, logs):
+    def setup_ui(self):
         layout = QVBoxLayout(self)
         
         # Log table
@@ -454,13 +521,8 @@ class AuditLogDialog(QDialog):
             }
         """)
         
-        # Populate logs
-        self.table.setRowCount(len(logs))
-        for i, log in enumerate(logs):
-            self.table.setItem(i, 0, QTableWidgetItem(log['timestamp']))
-            self.table.setItem(i, 1, QTableWidgetItem(log['action']))
-            self.table.setItem(i, 2, QTableWidgetItem(log['details']))
-            self.table.setItem(i, 3, QTableWidgetItem(log['user']))
+        # Further pages load as the user scrolls near the end
+        self.table.verticalScrollBar().valueChanged.connect(self.verificar_scroll)
         
         layout.addWidget(self.table)
         
@@ -481,3 +543,34 @@ class AuditLogDialog(QDialog):
         """)
         
         layout.addWidget(btn_close)
+
+    def cargar_pagina(self, cursor=None):
+        self.cargando = True
+        self.executor.submit(
+            'auditoria',
+            lambda: self.db.obtener_auditoria_pagina(usuario_id=self.usuario_id, limite=self.PAGE_SIZE, cursor=cursor),
+            self.mostrar_pagina,
+            self.error_pagina
+        )
+
+    def mostrar_pagina(self, pagina):
+        inicio = self.table.rowCount()
+        self.table.setRowCount(inicio + len(pagina['filas']))
+        for i, log in enumerate(pagina['filas'], start=inicio):
+            self.table.setItem(i, 0, QTableWidgetItem(str(log['fecha'])))
+            self.table.setItem(i, 1, QTableWidgetItem(log['accion']))
+            self.table.setItem(i, 2, QTableWidgetItem(log['tabla_afectada']))
+            self.table.setItem(i, 3, QTableWidgetItem(log['usuario_id']))
+        self.cursor = pagina['cursor']
+        self.cargando = False
+        # A first page that does not fill the view leaves no scroll bar to trigger the next one
+        self.verificar_scroll()
+
+    def error_pagina(self, mensaje):
+        self.cargando = False
+        QMessageBox.critical(self, 'Audit Log Error', f'Could not load audit logs: {mensaje}')
+
+    def verificar_scroll(self, value=None):
+        scroll = self.table.verticalScrollBar()
+        if self.cursor is not None and not self.cargando and scroll.value() >= scroll.maximum() - 5:
+            self.cargar_pagina(self.cursor)
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QComboBox, QTableWidget, QTableWidgetItem
+
+# Row key, kept on the first cell; UserRole stays free for the caller's own data
+ROL_CLAVE = Qt.ItemDataRole.UserRole + 1
+
+class TableSync:
+    # Applies a keyed diff to a QTableWidget: only removed, changed and new rows touch the
+    # widget, so selection and scroll position survive a refresh
+    def __init__(self, tabla: QTableWidget):
+        self.tabla = tabla
+        # key -> (cell texts, user data) as currently displayed
+        self.mostradas: Dict[Hashable, Tuple[Tuple[str, ...], Any]] = {}
+
+    def aplicar(self, filas: Iterable[Tuple[Hashable, Tuple[str, ...], Any]]) -> bool:
+        # filas: (key, cell texts, user data for the first cell). Returns whether anything changed.
+        nuevas = {clave: (tuple(valores), dato) for clave, valores, dato in filas}
+        if nuevas == self.mostradas and self.tabla.rowCount() == len(self.mostradas):
+            return False
+
+        tabla = self.tabla
+        ordenada = tabla.isSortingEnabled()
+        tabla.setSortingEnabled(False)
+        tabla.setUpdatesEnabled(False)
+        try:
+            if tabla.rowCount() != len(self.mostradas):
+                # Something else wrote to the table (an empty-state message, for instance)
+                tabla.clearSpans()
+                tabla.setRowCount(0)
+                self.mostradas = {}
+
+            for row in reversed(range(tabla.rowCount())):
+                clave = tabla.item(row, 0).data(ROL_CLAVE)
+                if clave not in nuevas:
+                    tabla.removeRow(row)
+                    del self.mostradas[clave]
+
+            posiciones = {tabla.item(row, 0).data(ROL_CLAVE): row for row in range(tabla.rowCount())}
+            for clave, (valores, dato) in nuevas.items():
+                row = posiciones.get(clave)
+                if row is None:
+                    row = tabla.rowCount()
+                    tabla.insertRow(row)
+                    for col, valor in enumerate(valores):
+                        tabla.setItem(row, col, QTableWidgetItem(valor))
+                    tabla.item(row, 0).setData(ROL_CLAVE, clave)
+                    tabla.item(row, 0).setData(Qt.ItemDataRole.UserRole, dato)
+                elif self.mostradas[clave] != (valores, dato):
+                    anteriores = self.mostradas[clave][0]
+                    for col, valor in enumerate(valores):
+                        if col >= len(anteriores) or anteriores[col] != valor:
+                            tabla.item(row, col).setText(valor)
+                    tabla.item(row, 0).setData(Qt.ItemDataRole.UserRole, dato)
+            self.mostradas = nuevas
+        finally:
+            tabla.setUpdatesEnabled(True)
+            tabla.setSortingEnabled(ordenada)
+        return True
+
+    def reiniciar(self):
+        # Call after writing to the table directly so the next aplicar() starts from scratch
+        self.mostradas = {}
+
+def sincronizar_combo(combo: QComboBox, opciones: List[Tuple[str, Any]]):
+    # Rebuilds the combo only when its options changed, keeping the current selection
+    actuales = [(combo.itemText(i), combo.itemData(i)) for i in range(combo.count())]
+    if actuales == opciones:
+        return
+    seleccionado = combo.currentData()
+    combo.blockSignals(True)
+    try:
+        combo.clear()
+        for texto, dato in opciones:
+            combo.addItem(texto, dato)
+        indice = combo.findData(seleccionado)
+        if indice >= 0:
+            combo.setCurrentIndex(indice)
+    finally:
+        combo.blockSignals(False)